@@ -35,7 +35,7 @@ def main():
         formats = ['xml', 'n3', 'json-ld']
         for fmt in formats:
             try:
-                build_knowledge_graph(output_format=fmt)
+                build_knowledge_graph(output_format=fmt, verbose=False)
                 print(f"✅ Formato {fmt} criado")
             except Exception as e:
                 print(f"⚠️  Erro criando formato {fmt}: {e}")
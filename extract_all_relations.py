@@ -4,12 +4,11 @@ Script para extrair relações de TODOS os chunks com entidades.
 """
 import sys
 from pathlib import Path
-import pickle
 
 # Adicionar src ao path
 sys.path.append(str(Path(__file__).parent / "src"))
 
-from knowledge_graph.relation_extractor import extract_relations
+from knowledge_graph.relation_extractor import extract_relations, save_relations
 
 def main():
     print("🔗 Iniciando extração de relações de TODOS os chunks...")
@@ -59,13 +58,13 @@ def main():
         output_file = Path("data/extracted_relations.pkl")
         print(f"\n💾 Salvando resultados finais em: {output_file}")
         
-        with open(output_file, 'wb') as f:
-            pickle.dump({
-                'relations': relations,
-                'statistics': stats,
-                'summary': summary,
-                'total_chunks_processed': stats.get('chunks_processed', 0)
-            }, f)
+        save_relations(
+            output_file,
+            relations,
+            statistics=stats,
+            summary=summary,
+            total_chunks_processed=stats.get('chunks_processed', 0)
+        )
         
         file_size_mb = output_file.stat().st_size / 1024 / 1024
         print(f"✅ Resultados salvos! Arquivo: {output_file} ({file_size_mb:.1f} MB)")
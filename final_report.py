@@ -11,6 +11,9 @@ import pickle
 import json
 from datetime import datetime
 
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent / "src"))
+
 def analyze_files():
     """Analisa todos os arquivos gerados."""
     
@@ -90,12 +93,12 @@ def load_pipeline_stats():
     
     try:
         # Relações
-        with open("data/extracted_relations.pkl", 'rb') as f:
-            rel_data = pickle.load(f)
-            stats['relations'] = {
-                'total': len(rel_data['relations']),
-                'unique_predicates': len(set(r.predicate for r in rel_data['relations']))
-            }
+        from knowledge_graph.relation_extractor import load_relations
+        relations = load_relations("data/extracted_relations.pkl")
+        stats['relations'] = {
+            'total': len(relations),
+            'unique_predicates': len(set(r.predicate for r in relations))
+        }
     except:
         stats['relations'] = {'total': 'N/A', 'unique_predicates': 'N/A'}
     
@@ -7,16 +7,100 @@ from rdflib import Graph, Namespace, RDF, RDFS, OWL, Literal, URIRef
 from rdflib.namespace import XSD, DCTERMS, FOAF
 import logging
 import pickle
+import json
+import mmap
+import os
 from typing import Dict, List, Set
 from pathlib import Path
 import sys
 import re
 from datetime import datetime
 
+# Classes necessárias para desserializar entidades e relações
+sys.path.append(str(Path(__file__).parent.parent))
+from knowledge_graph.entity_normalizer import NormalizedEntity
+from knowledge_graph.relation_extractor import Relation, relations_from_data
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Namespaces do Knowledge Graph
+ML_NAMESPACE = "http://ml-kg.org/ontology/"
+ENTITY_NAMESPACE = "http://ml-kg.org/entity/"
+RELATION_NAMESPACE = "http://ml-kg.org/relation/"
+
+# Classes principais da ontologia
+MAIN_CLASSES = [
+    ('Algorithm', 'Machine Learning Algorithm'),
+    ('Concept', 'Machine Learning Concept'),
+    ('Person', 'Person or Researcher'),
+    ('Organization', 'Organization or Institution'),
+    ('Software', 'Software or Tool'),
+    ('Metric', 'Evaluation Metric'),
+    ('Dataset', 'Dataset or Data Source'),
+    ('Publication', 'Academic Publication')
+]
+
+# Propriedades principais da ontologia
+MAIN_PROPERTIES = [
+    ('is_a', 'is a type of'),
+    ('part_of', 'is part of'),
+    ('uses', 'uses or utilizes'),
+    ('implements', 'implements'),
+    ('optimizes', 'optimizes'),
+    ('measures', 'measures or evaluates'),
+    ('created_by', 'was created by'),
+    ('applies_to', 'applies to')
+]
+
+
+# Tabela para limpar nomes ASCII: remove tudo que não é \w, espaço ou hífen
+_CLEAN_TABLE = {
+    c: None for c in range(128)
+    if not (chr(c).isalnum() or chr(c).isspace() or chr(c) in '-_')
+}
+
+# Colunas do sidecar de proveniência das relações
+PROVENANCE_COLUMNS = ('rel_id', 'subject', 'predicate', 'object', 'context', 'chunk_id', 'confidence')
+
+
+def _build_ontology_ntriples() -> bytes:
+    """
+    Gera o schema estático da ontologia em N-Triples.
+    
+    O schema não muda entre execuções, então é serializado uma única vez
+    na importação e carregado com um só `graph.parse`.
+    
+    Returns:
+        Schema da ontologia em N-Triples (UTF-8)
+    """
+    ml_entity = URIRef(ML_NAMESPACE + "Entity")
+    triples = [
+        (ml_entity, RDF.type, OWL.Class),
+        (ml_entity, RDFS.label, Literal("Machine Learning Entity")),
+    ]
+    
+    for class_name, description in MAIN_CLASSES:
+        class_uri = URIRef(ML_NAMESPACE + class_name.lower())
+        triples.append((class_uri, RDF.type, OWL.Class))
+        triples.append((class_uri, RDFS.label, Literal(class_name)))
+        triples.append((class_uri, RDFS.comment, Literal(description)))
+        triples.append((class_uri, RDFS.subClassOf, ml_entity))
+    
+    for prop_name, description in MAIN_PROPERTIES:
+        prop_uri = URIRef(RELATION_NAMESPACE + prop_name.lower())
+        triples.append((prop_uri, RDF.type, OWL.ObjectProperty))
+        triples.append((prop_uri, RDFS.label, Literal(prop_name.replace('_', ' '))))
+        triples.append((prop_uri, RDFS.comment, Literal(description)))
+    
+    lines = [f"{s.n3()} {p.n3()} {o.n3()} .\n" for s, p, o in triples]
+    return ''.join(lines).encode('utf-8')
+
+
+_ONTOLOGY_NT = _build_ontology_ntriples()
+
+
 class KnowledgeGraphBuilder:
     """Construtor do Knowledge Graph em RDF."""
     
@@ -26,9 +110,9 @@ class KnowledgeGraphBuilder:
         self.graph = Graph()
         
         # Definir namespaces
-        self.ML = Namespace("http://ml-kg.org/ontology/")
-        self.ENTITY = Namespace("http://ml-kg.org/entity/")
-        self.RELATION = Namespace("http://ml-kg.org/relation/")
+        self.ML = Namespace(ML_NAMESPACE)
+        self.ENTITY = Namespace(ENTITY_NAMESPACE)
+        self.RELATION = Namespace(RELATION_NAMESPACE)
         
         # Bind namespaces
         self.graph.bind("ml", self.ML)
@@ -40,6 +124,16 @@ class KnowledgeGraphBuilder:
         self.graph.bind("foaf", FOAF)
         self.graph.bind("dcterms", DCTERMS)
         
+        # URIs fixas do namespace ML (evita um __getattr__ do Namespace por tripla)
+        self._P_CANONICAL = self.ML.canonicalName
+        self._P_ALIAS = self.ML.alias
+        self._P_FREQ = self.ML.frequency
+        self._P_CONF = self.ML.confidence
+        self._P_CHUNK = self.ML.sourceChunk
+        
+        # Prefixo dos identificadores das instâncias de relação
+        self._REL_PREFIX = str(self.ENTITY) + 'rel_'
+        
         # Estatísticas
         self.stats = {
             'entities_added': 0,
@@ -49,6 +143,13 @@ class KnowledgeGraphBuilder:
             'relation_types': {}
         }
         
+        # Total de triplas, atualizado com um len(self.graph) ao fim de cada
+        # etapa de construção (não a cada tripla adicionada)
+        self._triple_count = 0
+        
+        # Metadados das relações (proveniência), mantidos fora do grafo RDF
+        self.provenance: List[tuple] = []
+        
         logger.info("✅ Knowledge Graph builder inicializado")
     
     def _create_entity_uri(self, entity_name: str) -> URIRef:
@@ -62,8 +163,12 @@ class KnowledgeGraphBuilder:
             URIRef da entidade
         """
         # Limpar nome para URI válida
-        clean_name = re.sub(r'[^\w\s-]', '', entity_name)
-        clean_name = re.sub(r'\s+', '_', clean_name)
+        if entity_name.isascii():
+            # Fast path: translate + split/join rodam em C, sem regex
+            clean_name = '_'.join(entity_name.translate(_CLEAN_TABLE).split())
+        else:
+            clean_name = re.sub(r'[^\w\s-]', '', entity_name)
+            clean_name = re.sub(r'\s+', '_', clean_name)
         clean_name = clean_name.lower().strip('_')
         
         return self.ENTITY[clean_name]
@@ -123,46 +228,9 @@ class KnowledgeGraphBuilder:
         """Adiciona schema básico da ontologia ML/DL."""
         logger.info("Adicionando schema da ontologia...")
         
-        # Classe principal Entity
-        self.graph.add((self.ML.Entity, RDF.type, OWL.Class))
-        self.graph.add((self.ML.Entity, RDFS.label, Literal("Machine Learning Entity")))
-        
-        # Classes principais
-        main_classes = [
-            ('Algorithm', 'Machine Learning Algorithm'),
-            ('Concept', 'Machine Learning Concept'),
-            ('Person', 'Person or Researcher'),
-            ('Organization', 'Organization or Institution'),
-            ('Software', 'Software or Tool'),
-            ('Metric', 'Evaluation Metric'),
-            ('Dataset', 'Dataset or Data Source'),
-            ('Publication', 'Academic Publication')
-        ]
-        
-        for class_name, description in main_classes:
-            class_uri = self.ML[class_name.lower()]
-            self.graph.add((class_uri, RDF.type, OWL.Class))
-            self.graph.add((class_uri, RDFS.label, Literal(class_name)))
-            self.graph.add((class_uri, RDFS.comment, Literal(description)))
-            self.graph.add((class_uri, RDFS.subClassOf, self.ML.Entity))
-        
-        # Propriedades principais
-        main_properties = [
-            ('is_a', 'is a type of'),
-            ('part_of', 'is part of'),
-            ('uses', 'uses or utilizes'),
-            ('implements', 'implements'),
-            ('optimizes', 'optimizes'),
-            ('measures', 'measures or evaluates'),
-            ('created_by', 'was created by'),
-            ('applies_to', 'applies to')
-        ]
-        
-        for prop_name, description in main_properties:
-            prop_uri = self._create_relation_uri(prop_name)
-            self.graph.add((prop_uri, RDF.type, OWL.ObjectProperty))
-            self.graph.add((prop_uri, RDFS.label, Literal(prop_name.replace('_', ' '))))
-            self.graph.add((prop_uri, RDFS.comment, Literal(description)))
+        # Schema estático pré-serializado (um único parse em vez de ~60 adds)
+        self.graph.parse(data=_ONTOLOGY_NT, format='nt')
+        self._triple_count = len(self.graph)
         
         logger.info("✅ Schema da ontologia adicionado")
     
@@ -175,6 +243,10 @@ class KnowledgeGraphBuilder:
         """
         logger.info(f"Adicionando {len(normalized_entities)} entidades ao grafo...")
         
+        add_triple = self.graph.add
+        xsd_integer = XSD.integer
+        xsd_float = XSD.float
+        
         for entity_name, entity_data in normalized_entities.items():
             try:
                 # Criar URI da entidade
@@ -185,22 +257,22 @@ class KnowledgeGraphBuilder:
                 class_uri = self._add_entity_type_class(entity_type)
                 
                 # Triplas básicas da entidade
-                self.graph.add((entity_uri, RDF.type, class_uri))
-                self.graph.add((entity_uri, RDFS.label, Literal(entity_name)))
-                self.graph.add((entity_uri, self.ML.canonicalName, Literal(entity_name)))
+                add_triple((entity_uri, RDF.type, class_uri))
+                add_triple((entity_uri, RDFS.label, Literal(entity_name)))
+                add_triple((entity_uri, self._P_CANONICAL, Literal(entity_name)))
                 
                 # Aliases
                 for alias in entity_data.aliases:
                     if alias and alias != entity_name:
-                        self.graph.add((entity_uri, self.ML.alias, Literal(alias)))
+                        add_triple((entity_uri, self._P_ALIAS, Literal(alias)))
                 
                 # Metadados
-                self.graph.add((entity_uri, self.ML.frequency, Literal(entity_data.frequency, datatype=XSD.integer)))
-                self.graph.add((entity_uri, self.ML.confidence, Literal(entity_data.confidence, datatype=XSD.float)))
+                add_triple((entity_uri, self._P_FREQ, Literal(entity_data.frequency, datatype=xsd_integer)))
+                add_triple((entity_uri, self._P_CONF, Literal(entity_data.confidence, datatype=xsd_float)))
                 
                 # Source chunks (proveniência)
                 for chunk_id in entity_data.source_chunks[:5]:  # Limitar para não sobrecarregar
-                    self.graph.add((entity_uri, self.ML.sourceChunk, Literal(chunk_id)))
+                    add_triple((entity_uri, self._P_CHUNK, Literal(chunk_id)))
                 
                 self.stats['entities_added'] += 1
                 self.stats['entity_types'][entity_type] = self.stats['entity_types'].get(entity_type, 0) + 1
@@ -209,6 +281,7 @@ class KnowledgeGraphBuilder:
                 logger.error(f"Erro adicionando entidade {entity_name}: {e}")
                 continue
         
+        self._triple_count = len(self.graph)
         logger.info(f"✅ {self.stats['entities_added']} entidades adicionadas")
     
     def add_relations(self, relations: List):
@@ -220,6 +293,12 @@ class KnowledgeGraphBuilder:
         """
         logger.info(f"Adicionando {len(relations)} relações ao grafo...")
         
+        add_triple = self.graph.add
+        provenance_append = self.provenance.append
+        rel_prefix = self._REL_PREFIX
+        relations_added = self.stats['relations_added']
+        relation_types = self.stats['relation_types']
+        
         for relation in relations:
             try:
                 # Criar URIs
@@ -228,25 +307,28 @@ class KnowledgeGraphBuilder:
                 predicate_uri = self._add_relation_property(relation.predicate)
                 
                 # Adicionar tripla principal
-                self.graph.add((subject_uri, predicate_uri, object_uri))
+                add_triple((subject_uri, predicate_uri, object_uri))
                 
-                # Criar URI para a instância da relação (para metadados)
-                relation_instance_uri = self.ENTITY[f"rel_{self.stats['relations_added']}"]
-                self.graph.add((relation_instance_uri, RDF.type, self.ML.Relation))
-                self.graph.add((relation_instance_uri, self.ML.subject, subject_uri))
-                self.graph.add((relation_instance_uri, self.ML.predicate, predicate_uri))
-                self.graph.add((relation_instance_uri, self.ML.object, object_uri))
-                self.graph.add((relation_instance_uri, self.ML.context, Literal(relation.context)))
-                self.graph.add((relation_instance_uri, self.ML.sourceChunk, Literal(relation.chunk_id)))
-                self.graph.add((relation_instance_uri, self.ML.confidence, Literal(relation.confidence, datatype=XSD.float)))
+                # Metadados da relação vão para o sidecar de proveniência
+                provenance_append((
+                    rel_prefix + str(relations_added),
+                    relation.subject,
+                    relation.predicate,
+                    relation.object,
+                    relation.context,
+                    relation.chunk_id,
+                    relation.confidence
+                ))
                 
-                self.stats['relations_added'] += 1
-                self.stats['relation_types'][relation.predicate] = self.stats['relation_types'].get(relation.predicate, 0) + 1
+                relations_added += 1
+                relation_types[relation.predicate] = relation_types.get(relation.predicate, 0) + 1
                 
             except Exception as e:
                 logger.error(f"Erro adicionando relação {relation.subject} {relation.predicate} {relation.object}: {e}")
                 continue
         
+        self.stats['relations_added'] = relations_added
+        self._triple_count = len(self.graph)
         logger.info(f"✅ {self.stats['relations_added']} relações adicionadas")
     
     def add_metadata(self):
@@ -266,13 +348,15 @@ class KnowledgeGraphBuilder:
         # Estatísticas
         self.graph.add((kg_uri, self.ML.totalEntities, Literal(self.stats['entities_added'], datatype=XSD.integer)))
         self.graph.add((kg_uri, self.ML.totalRelations, Literal(self.stats['relations_added'], datatype=XSD.integer)))
-        self.graph.add((kg_uri, self.ML.totalTriples, Literal(len(self.graph), datatype=XSD.integer)))
+        self._triple_count = len(self.graph)
+        self.graph.add((kg_uri, self.ML.totalTriples, Literal(self._triple_count, datatype=XSD.integer)))
+        self._triple_count += 1  # A própria tripla totalTriples
         
         logger.info("✅ Metadados adicionados")
     
     def get_statistics(self) -> Dict:
         """Retorna estatísticas do grafo construído."""
-        self.stats['triples_total'] = len(self.graph)
+        self.stats['triples_total'] = self._triple_count
         return self.stats.copy()
     
     def save_graph(self, output_path: str = None, format: str = 'turtle'):
@@ -303,64 +387,112 @@ class KnowledgeGraphBuilder:
             logger.error(f"❌ Erro salvando grafo: {e}")
             raise
     
+    def save_provenance(self, output_path: str = "data/ml_kg_provenance.pkl"):
+        """
+        Salva os metadados das relações (contexto, chunk, confiança) em sidecar.
+        
+        Cada linha é ligada ao grafo pela tripla (subject, predicate, object)
+        e identificada por `rel_id`.
+        
+        Args:
+            output_path: Caminho do arquivo de proveniência
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        logger.info(f"Salvando proveniência de {len(self.provenance)} relações em: {output_path}")
+        
+        with open(output_path, 'wb') as f:
+            pickle.dump({
+                'columns': PROVENANCE_COLUMNS,
+                'rows': self.provenance
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        return output_path
+    
     def generate_summary_report(self) -> str:
         """Gera relatório resumo do KG construído."""
-        report = f"""
-🕸️ KNOWLEDGE GRAPH - RELATÓRIO FINAL
-{'=' * 50}
-
-📊 ESTATÍSTICAS GERAIS:
-   • Total de triplas RDF: {len(self.graph):,}
-   • Entidades adicionadas: {self.stats['entities_added']:,}
-   • Relações adicionadas: {self.stats['relations_added']:,}
-
-📚 DISTRIBUIÇÃO DE ENTIDADES:
-"""
+        parts = [
+            "\n🕸️ KNOWLEDGE GRAPH - RELATÓRIO FINAL\n",
+            f"{'=' * 50}\n",
+            "\n📊 ESTATÍSTICAS GERAIS:\n",
+            f"   • Total de triplas RDF: {self._triple_count:,}\n",
+            f"   • Entidades adicionadas: {self.stats['entities_added']:,}\n",
+            f"   • Relações adicionadas: {self.stats['relations_added']:,}\n",
+            "\n📚 DISTRIBUIÇÃO DE ENTIDADES:\n"
+        ]
+        append = parts.append
+        
         for entity_type, count in sorted(self.stats['entity_types'].items(), key=lambda x: x[1], reverse=True):
-            report += f"   • {entity_type}: {count:,}\n"
+            append(f"   • {entity_type}: {count:,}\n")
         
-        report += f"\n🔗 DISTRIBUIÇÃO DE RELAÇÕES:\n"
+        append("\n🔗 DISTRIBUIÇÃO DE RELAÇÕES:\n")
         for relation_type, count in sorted(self.stats['relation_types'].items(), key=lambda x: x[1], reverse=True)[:10]:
-            report += f"   • {relation_type}: {count:,}\n"
+            append(f"   • {relation_type}: {count:,}\n")
         
-        report += f"\n🎯 NAMESPACES UTILIZADOS:\n"
+        append("\n🎯 NAMESPACES UTILIZADOS:\n")
         for prefix, namespace in self.graph.namespaces():
-            report += f"   • {prefix}: {namespace}\n"
+            append(f"   • {prefix}: {namespace}\n")
         
-        report += f"\n✅ Knowledge Graph construído com sucesso!"
+        append("\n✅ Knowledge Graph construído com sucesso!")
         
-        return report
+        return ''.join(parts)
+    
+    def save_statistics(self, stats: Dict = None, output_path: str = "data/kg_construction_stats.json"):
+        """
+        Salva as estatísticas do KG em JSON para consumo por outras etapas.
+        
+        Args:
+            stats: Estatísticas já obtidas com get_statistics (None = obtém aqui)
+            output_path: Caminho do arquivo JSON
+        """
+        if stats is None:
+            stats = self.get_statistics()
+        
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        
+        return output_path
+
+
+def _load_pickle(file_path: str):
+    """Carrega um pickle mapeando o arquivo em memória em vez de lê-lo inteiro."""
+    with open(file_path, 'rb') as f:
+        # mmap não aceita arquivo vazio; pickle.load dá o erro usual (EOFError)
+        if os.fstat(f.fileno()).st_size == 0:
+            return pickle.load(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return pickle.loads(mm)
 
 
-def load_normalized_entities(file_path: str = "data/normalized_entities.pkl") -> Dict:
+def load_normalized_entities(file_path: str = "data/normalized_entities.pkl") -> Dict[str, NormalizedEntity]:
     """Carrega entidades normalizadas."""
     logger.info(f"Carregando entidades normalizadas de: {file_path}")
     
-    # Importar classes necessárias
-    sys.path.append(str(Path(__file__).parent.parent))
-    
-    with open(file_path, 'rb') as f:
-        data = pickle.load(f)
+    data = _load_pickle(file_path)
     
     return data['normalized_entities']
 
 
-def load_extracted_relations(file_path: str = "data/extracted_relations.pkl") -> List:
+def load_extracted_relations(file_path: str = "data/extracted_relations.pkl") -> List[Relation]:
     """Carrega relações extraídas."""
     logger.info(f"Carregando relações extraídas de: {file_path}")
     
-    with open(file_path, 'rb') as f:
-        data = pickle.load(f)
+    data = _load_pickle(file_path)
     
-    return data['relations']
+    return relations_from_data(data)
 
 
-def build_knowledge_graph(output_format: str = 'turtle') -> Dict:
+def build_knowledge_graph(output_format: str = 'turtle', verbose: bool = True) -> Dict:
     """
     Função principal para construir o Knowledge Graph.
     
     Args:
         output_format: Formato de saída ('turtle', 'xml', 'nt', 'json-ld')
+        verbose: Se True, imprime o relatório completo no stdout
         
     Returns:
         Dicionário com estatísticas e caminhos dos arquivos
@@ -387,24 +519,29 @@ def build_knowledge_graph(output_format: str = 'turtle') -> Dict:
         
         # Salvar grafo
         output_file = builder.save_graph(format=output_format)
+        provenance_file = builder.save_provenance()
         
         # Estatísticas
         stats = builder.get_statistics()
+        stats_file = builder.save_statistics(stats)
         
         # Relatório
         report = builder.generate_summary_report()
-        print(report)
+        if verbose:
+            print(report)
         
         # Salvar relatório
         report_file = Path("data/kg_construction_report.txt")
-        with open(report_file, 'w') as f:
+        with open(report_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
             f.write(report)
         
         return {
             'statistics': stats,
             'output_file': str(output_file),
+            'provenance_file': str(provenance_file),
             'report_file': str(report_file),
-            'graph_size': len(builder.graph)
+            'stats_file': str(stats_file),
+            'graph_size': stats['triples_total']
         }
         
     except Exception as e:
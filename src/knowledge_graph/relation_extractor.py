@@ -5,14 +5,20 @@ Passo 5 do pipeline de construção do Knowledge Graph.
 
 import ollama
 import logging
+import hashlib
 import json
+import os
 import pickle
+import sqlite3
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Set, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 import sys
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 # Adicionar src ao path para imports
 sys.path.append(str(Path(__file__).parent.parent))
@@ -22,28 +28,163 @@ from knowledge_graph.chunk_loader import load_chunks, TextChunk
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Decoder reutilizado para localizar objetos JSON dentro da resposta do LLM
+_DECODER = json.JSONDecoder()
+_RELATIONS_ARRAY_RE = re.compile(r'"relations"\s*:\s*\[')
+
+# Padrões do parser manual (fallback para JSON malformado)
+_SUBJECT_RE = re.compile(r'"subject":\s*"([^"]+)"')
+_PREDICATE_RE = re.compile(r'"predicate":\s*"([^"]+)"')
+_OBJECT_RE = re.compile(r'"object":\s*"([^"]+)"')
+
+# Prompt de extração de relações (${relations} é preenchido uma vez por extrator)
+_RELATION_PROMPT = string.Template("""You are an expert in Machine Learning and Deep Learning. Extract semantic relations between entities from the given text.
+
+TEXT:
+${text}  # Limitar tamanho do contexto
+
+ENTITIES FOUND:
+${entities}
+
+RELATION TYPES TO EXTRACT:
+${relations}
+
+TASK:
+1. Find semantic relationships between the entities in the text
+2. Use ONLY the relation types listed above
+3. Extract relations that are explicitly or clearly implied in the text
+4. Include the specific sentence/phrase that supports each relation
+
+RESPONSE FORMAT (JSON):
+{
+  "relations": [
+    {
+      "subject": "Neural Network",
+      "predicate": "uses", 
+      "object": "Gradient Descent",
+      "context": "Neural networks are trained using gradient descent optimization"
+    },
+    {
+      "subject": "Support Vector Machine",
+      "predicate": "solves",
+      "object": "Classification Problem", 
+      "context": "SVM is effective for classification tasks"
+    }
+  ]
+}
+
+Important: 
+- Only extract relations that are clearly supported by the text
+- Use entity names EXACTLY as they appear in the entities list
+- Include meaningful context for each relation
+- Return valid JSON only""")
+
+def _estimate_tokens(text: str) -> int:
+    """Estimativa rápida de tokens (~4 caracteres por token)."""
+    return len(text) // 4
+
+
+class LLMResponseCache:
+    """Cache persistente (SQLite) de respostas do LLM indexado pelo hash do prompt."""
+    
+    def __init__(self, db_path: str = "data/llm_cache.sqlite"):
+        """
+        Abre (ou cria) o cache em disco.
+        
+        Args:
+            db_path: Caminho do arquivo SQLite
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        """Gera a chave do cache para um par (modelo, prompt)."""
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta em cache ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def set(self, key: str, response: str):
+        """Armazena uma resposta no cache."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (key, response)
+            )
+            self._conn.commit()
+    
+    def close(self):
+        """Fecha a conexão com o arquivo SQLite."""
+        with self._lock:
+            self._conn.close()
+    
+    def __enter__(self) -> 'LLMResponseCache':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@dataclass(slots=True)
 class Relation:
-    """Representa uma relação extraída entre duas entidades."""
+    """Representa uma relação extraída entre duas entidades (sem __dict__ por instância)."""
     subject: str
     predicate: str
     object: str
     chunk_id: str
     confidence: float
     context: str  # Frase/contexto onde a relação foi encontrada
+    
+    def __setstate__(self, state):
+        """
+        Restaura o estado vindo do pickle. Pickles gravados antes de
+        slots=True guardam o estado como dict (__dict__); os atuais, como
+        tupla (None, dict dos slots).
+        """
+        if isinstance(state, tuple):
+            dict_state, slots_state = state
+            state = {**(dict_state or {}), **(slots_state or {})}
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
 
 class RelationExtractor:
     """Extrator de relações entre entidades usando LLM."""
     
-    def __init__(self, model_name: str = "llama3.2:3b"):
+    def __init__(self, model_name: str = "llama3.2:3b", max_workers: int = None,
+                 cache_path: Optional[str] = "data/llm_cache.sqlite",
+                 max_prompt_tokens: int = 3500, max_prompt_entities: int = 30):
         """
         Inicializa o extrator de relações.
         
         Args:
             model_name: Nome do modelo Ollama a usar
+            max_workers: Requisições simultâneas ao Ollama (padrão: OLLAMA_NUM_PARALLEL ou 8)
+            cache_path: Arquivo do cache de respostas do LLM (None desativa o cache)
+            max_prompt_tokens: Orçamento estimado de tokens por prompt
+            max_prompt_entities: Máximo de entidades no prompt reduzido
         """
         self.model_name = model_name
         self.relations: List[Relation] = []
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_prompt_entities = max_prompt_entities
+        
+        # Cache persistente prompt → resposta (reexecuções não repetem chamadas ao LLM)
+        self.cache = LLMResponseCache(cache_path) if cache_path else None
+        
+        # Requisições concorrentes permitem ao Ollama agrupar as inferências em batch
+        if max_workers is None:
+            max_workers = int(os.environ.get('OLLAMA_NUM_PARALLEL', 8))
+        self.max_workers = max(1, max_workers)
         
         # Teste de conectividade
         try:
@@ -96,13 +237,26 @@ class RelationExtractor:
             'developed_by': 'X was developed by Y'
         }
         
+        # Parte estática do prompt (esquema de relações) montada uma única vez
+        self._relations_text = '\n'.join(f"- {rel}: {desc}" for rel, desc in self.relation_schema.items())
+        self._prompt_template = string.Template(
+            _RELATION_PROMPT.safe_substitute(relations=self._relations_text)
+        )
+        
+        # Índice case-insensitive dos predicados do esquema
+        self._predicates_lower = {p.lower(): p for p in self.relation_schema}
+        
         # Estatísticas
         self.stats = {
             'chunks_processed': 0,
             'relations_extracted': 0,
             'llm_calls': 0,
+            'cache_hits': 0,
+            'duplicate_chunks': 0,
+            'oversized_prompts_skipped': 0,
             'failed_extractions': 0
         }
+        self._stats_lock = threading.Lock()
     
     def _create_relation_extraction_prompt(self, chunk_text: str, entities: List[str]) -> str:
         """
@@ -115,50 +269,36 @@ class RelationExtractor:
         Returns:
             Prompt formatado para o LLM
         """
+        chunk_text = chunk_text[:1500]  # Limitar tamanho do contexto
         entities_text = '\n'.join(f"- {entity}" for entity in entities)
-        relations_text = '\n'.join(f"- {rel}: {desc}" for rel, desc in self.relation_schema.items())
         
-        prompt = f"""You are an expert in Machine Learning and Deep Learning. Extract semantic relations between entities from the given text.
-
-TEXT:
-{chunk_text[:1500]}  # Limitar tamanho do contexto
-
-ENTITIES FOUND:
-{entities_text}
-
-RELATION TYPES TO EXTRACT:
-{relations_text}
-
-TASK:
-1. Find semantic relationships between the entities in the text
-2. Use ONLY the relation types listed above
-3. Extract relations that are explicitly or clearly implied in the text
-4. Include the specific sentence/phrase that supports each relation
-
-RESPONSE FORMAT (JSON):
-{{
-  "relations": [
-    {{
-      "subject": "Neural Network",
-      "predicate": "uses", 
-      "object": "Gradient Descent",
-      "context": "Neural networks are trained using gradient descent optimization"
-    }},
-    {{
-      "subject": "Support Vector Machine",
-      "predicate": "solves",
-      "object": "Classification Problem", 
-      "context": "SVM is effective for classification tasks"
-    }}
-  ]
-}}
-
-Important: 
-- Only extract relations that are clearly supported by the text
-- Use entity names EXACTLY as they appear in the entities list
-- Include meaningful context for each relation
-- Return valid JSON only"""
-
+        return self._prompt_template.substitute(text=chunk_text, entities=entities_text)
+    
+    def _create_shortened_prompt(self, chunk_text: str, entities: List[str]) -> Optional[str]:
+        """
+        Cria uma versão reduzida do prompt para chunks com muitas entidades.
+        
+        Usa um trecho menor do texto e apenas as entidades que aparecem nele
+        (até `max_prompt_entities`).
+        
+        Args:
+            chunk_text: Texto do chunk
+            entities: Lista de entidades encontradas no chunk
+            
+        Returns:
+            Prompt reduzido, ou None se ainda exceder o orçamento de tokens
+        """
+        short_text = chunk_text[:1000]
+        short_text_lower = short_text.lower()
+        short_entities = [e for e in entities if e.lower() in short_text_lower][:self.max_prompt_entities]
+        
+        if len(short_entities) < 2:
+            return None
+        
+        prompt = self._create_relation_extraction_prompt(short_text, short_entities)
+        if _estimate_tokens(prompt) > self.max_prompt_tokens:
+            return None
+        
         return prompt
     
     def _parse_relations_response(self, response: str) -> List[Dict]:
@@ -171,67 +311,93 @@ Important:
         Returns:
             Lista de relações extraídas
         """
+        # Fast path: decodificar apenas o array de "relations", ignorando
+        # o restante do objeto e qualquer texto depois dele
+        for match in _RELATIONS_ARRAY_RE.finditer(response):
+            try:
+                relations, _ = _DECODER.raw_decode(response, match.end() - 1)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(relations, list):
+                return relations
+        
+        # Resposta é JSON válido (sem array de relações)
         try:
-            # Remover markdown code blocks se existirem
-            response = re.sub(r'```json\s*', '', response)
-            response = re.sub(r'```\s*$', '', response)
-            
-            # Tentar extrair JSON da resposta
+            data = json.loads(response)
+            if isinstance(data, dict):
+                return data.get('relations', [])
+        except json.JSONDecodeError:
+            pass
+        
+        try:
+            # Procurar o objeto JSON com "relations" a partir de cada '{'
+            # (o decoder encontra o fim real do objeto, ignorando texto extra)
             json_start = response.find('{')
-            json_end = response.rfind('}') + 1
             
-            if json_start == -1 or json_end == 0:
+            if json_start == -1:
                 logger.warning("Nenhum JSON encontrado na resposta de relações")
                 return []
             
-            json_text = response[json_start:json_end]
-            
-            # Limpar problemas comuns de JSON
-            json_text = json_text.replace('\n', ' ').replace('\r', '')
-            json_text = re.sub(r',\s*}', '}', json_text)
-            json_text = re.sub(r',\s*]', ']', json_text)
-            
-            data = json.loads(json_text)
-            
-            return data.get('relations', [])
-            
-        except json.JSONDecodeError as e:
-            logger.warning(f"Erro parsing JSON de relações: {e}")
-            # Parser manual simplificado
-            try:
-                relations = []
-                lines = response.split('\n')
-                current_relation = {}
-                
-                for line in lines:
-                    if 'subject' in line:
-                        subject = re.search(r'"subject":\s*"([^"]+)"', line)
-                        if subject:
-                            current_relation['subject'] = subject.group(1)
-                    elif 'predicate' in line and 'subject' in current_relation:
-                        predicate = re.search(r'"predicate":\s*"([^"]+)"', line)
-                        if predicate:
-                            current_relation['predicate'] = predicate.group(1)
-                    elif 'object' in line and 'predicate' in current_relation:
-                        obj = re.search(r'"object":\s*"([^"]+)"', line)
-                        if obj:
-                            current_relation['object'] = obj.group(1)
-                            current_relation['context'] = "Extracted from text"
-                            relations.append(current_relation.copy())
-                            current_relation = {}
+            while json_start != -1:
+                try:
+                    data, json_end = _DECODER.raw_decode(response, json_start)
+                except json.JSONDecodeError:
+                    json_start = response.find('{', json_start + 1)
+                    continue
                 
-                if relations:
-                    logger.info(f"Recuperadas {len(relations)} relações com parser manual")
-                    return relations
-                    
-            except Exception:
-                pass
+                if isinstance(data, dict) and 'relations' in data:
+                    return data['relations']
                 
-            return []
+                json_start = response.find('{', json_end)
+            
+            logger.warning("Erro parsing JSON de relações: nenhum objeto válido encontrado")
+            return self._parse_relations_manually(response)
+            
         except Exception as e:
             logger.error(f"Erro inesperado parsing relações: {e}")
             return []
     
+    def _parse_relations_manually(self, response: str) -> List[Dict]:
+        """
+        Parser manual simplificado, linha a linha, para JSON malformado.
+        
+        Args:
+            response: Resposta do LLM
+            
+        Returns:
+            Lista de relações recuperadas
+        """
+        try:
+            relations = []
+            lines = response.split('\n')
+            current_relation = {}
+            
+            for line in lines:
+                if 'subject' in line:
+                    subject = _SUBJECT_RE.search(line)
+                    if subject:
+                        current_relation['subject'] = subject.group(1)
+                elif 'predicate' in line and 'subject' in current_relation:
+                    predicate = _PREDICATE_RE.search(line)
+                    if predicate:
+                        current_relation['predicate'] = predicate.group(1)
+                elif 'object' in line and 'predicate' in current_relation:
+                    obj = _OBJECT_RE.search(line)
+                    if obj:
+                        current_relation['object'] = obj.group(1)
+                        current_relation['context'] = "Extracted from text"
+                        relations.append(current_relation.copy())
+                        current_relation = {}
+            
+            if relations:
+                logger.info(f"Recuperadas {len(relations)} relações com parser manual")
+                return relations
+                
+        except Exception:
+            pass
+            
+        return []
+    
     def _filter_valid_relations(self, relations: List[Dict], entities: List[str]) -> List[Dict]:
         """
         Filtra relações válidas baseado nas entidades disponíveis.
@@ -244,7 +410,19 @@ Important:
             Lista de relações filtradas
         """
         valid_relations = []
-        entities_lower = [e.lower() for e in entities]
+        
+        # Índices das entidades: match exato O(1), substring só como fallback
+        entities_lower = {}
+        for entity in entities:
+            entities_lower.setdefault(entity.lower(), entity)
+        
+        def resolve_entity(name: str) -> Optional[str]:
+            name_lower = name.lower()
+            exact = entities_lower.get(name_lower)
+            if exact is not None:
+                return exact
+            return next((entity for key, entity in entities_lower.items()
+                         if name_lower in key or key in name_lower), None)
         
         for relation in relations:
             try:
@@ -257,27 +435,26 @@ Important:
                 if not (subject and predicate and obj):
                     continue
                 
+                # Verificar se predicado está no esquema
+                predicate_exact = self._predicates_lower.get(predicate.lower())
+                if predicate_exact is None:
+                    continue
+                
                 # Verificar se subject e object estão na lista de entidades (case insensitive)
-                subject_valid = any(subject.lower() in entity.lower() or entity.lower() in subject.lower() 
-                                  for entity in entities)
-                object_valid = any(obj.lower() in entity.lower() or entity.lower() in obj.lower() 
-                                 for entity in entities)
+                subject_exact = resolve_entity(subject)
+                if subject_exact is None:
+                    continue
                 
-                # Verificar se predicado está no esquema
-                predicate_valid = predicate.lower() in [p.lower() for p in self.relation_schema.keys()]
+                object_exact = resolve_entity(obj)
+                if object_exact is None:
+                    continue
                 
-                if subject_valid and object_valid and predicate_valid:
-                    # Encontrar entidades exatas
-                    subject_exact = next((e for e in entities if subject.lower() in e.lower() or e.lower() in subject.lower()), subject)
-                    object_exact = next((e for e in entities if obj.lower() in e.lower() or e.lower() in obj.lower()), obj)
-                    predicate_exact = next((p for p in self.relation_schema.keys() if p.lower() == predicate.lower()), predicate)
-                    
-                    relation['subject'] = subject_exact
-                    relation['predicate'] = predicate_exact
-                    relation['object'] = object_exact
-                    relation['context'] = context or "Extracted from text"
-                    
-                    valid_relations.append(relation)
+                relation['subject'] = subject_exact
+                relation['predicate'] = predicate_exact
+                relation['object'] = object_exact
+                relation['context'] = context or "Extracted from text"
+                
+                valid_relations.append(relation)
                 
             except Exception as e:
                 logger.warning(f"Erro validando relação: {e}")
@@ -285,6 +462,39 @@ Important:
         
         return valid_relations
     
+    def _chat(self, prompt: str) -> str:
+        """
+        Envia o prompt ao LLM, consultando antes o cache persistente.
+        
+        Args:
+            prompt: Prompt completo
+            
+        Returns:
+            Conteúdo da resposta do LLM
+        """
+        key = None
+        if self.cache is not None:
+            key = LLMResponseCache.make_key(self.model_name, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._stats_lock:
+                    self.stats['cache_hits'] += 1
+                return cached
+        
+        response = ollama.chat(
+            model=self.model_name,
+            messages=[{'role': 'user', 'content': prompt}]
+        )
+        
+        with self._stats_lock:
+            self.stats['llm_calls'] += 1
+        
+        content = response['message']['content']
+        if self.cache is not None:
+            self.cache.set(key, content)
+        
+        return content
+    
     def extract_relations_from_chunk(self, chunk: TextChunk, entities_in_chunk: List[str]) -> List[Relation]:
         """
         Extrai relações de um chunk específico.
@@ -303,19 +513,23 @@ Important:
         relations = []
         
         try:
-            # Criar prompt
+            # Criar prompt (encurtado se estimar mais tokens que o orçamento)
             prompt = self._create_relation_extraction_prompt(chunk.content, entities_in_chunk)
+            if _estimate_tokens(prompt) > self.max_prompt_tokens:
+                prompt = self._create_shortened_prompt(chunk.content, entities_in_chunk)
             
-            # Chamar LLM
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[{'role': 'user', 'content': prompt}]
-            )
+            if prompt is None:
+                logger.warning(f"Prompt do chunk {chunk.chunk_id} excede {self.max_prompt_tokens} tokens, ignorando")
+                with self._stats_lock:
+                    self.stats['oversized_prompts_skipped'] += 1
+                    self.stats['chunks_processed'] += 1
+                return []
             
-            self.stats['llm_calls'] += 1
+            # Chamar LLM (ou reutilizar resposta em cache)
+            response_text = self._chat(prompt)
             
             # Parse da resposta
-            raw_relations = self._parse_relations_response(response['message']['content'])
+            raw_relations = self._parse_relations_response(response_text)
             
             # Filtrar relações válidas
             valid_relations = self._filter_valid_relations(raw_relations, entities_in_chunk)
@@ -332,13 +546,16 @@ Important:
                 )
                 relations.append(relation)
             
-            self.stats['relations_extracted'] += len(relations)
+            with self._stats_lock:
+                self.stats['relations_extracted'] += len(relations)
             
         except Exception as e:
             logger.error(f"Erro extraindo relações do chunk {chunk.chunk_id}: {e}")
-            self.stats['failed_extractions'] += 1
+            with self._stats_lock:
+                self.stats['failed_extractions'] += 1
         
-        self.stats['chunks_processed'] += 1
+        with self._stats_lock:
+            self.stats['chunks_processed'] += 1
         return relations
     
     def extract_relations_from_chunks(self, chunks_entities: Dict[str, List[str]], 
@@ -365,19 +582,46 @@ Important:
             chunk_ids = chunk_ids[:max_chunks]
             logger.info(f"Limitando processamento a {max_chunks} chunks para teste")
         
-        all_relations = []
-        
-        for i, chunk_id in enumerate(chunk_ids):
-            if (i + 1) % 50 == 0:
-                logger.info(f"Processado {i + 1}/{len(chunk_ids)} chunks...")
-            
+        # Selecionar chunks com entidades suficientes, agrupando os idênticos
+        # (mesmo texto e mesmo conjunto de entidades) para chamar o LLM uma vez só
+        ordered = []
+        representatives = {}
+        for chunk_id in chunk_ids:
             chunk = chunks_dict.get(chunk_id)
             entities = chunks_entities.get(chunk_id, [])
             
-            if not chunk or len(entities) < 2:
-                continue
+            if chunk and len(entities) >= 2:
+                signature = (chunk.content, frozenset(entities))
+                representatives.setdefault(signature, (chunk, entities))
+                ordered.append((chunk, signature))
+        
+        duplicates = len(ordered) - len(representatives)
+        if duplicates:
+            logger.info(f"{duplicates} chunks duplicados reutilizarão relações já extraídas")
+        
+        # Disparar chamadas ao LLM em paralelo
+        results = {}
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self.extract_relations_from_chunk, chunk, entities): signature
+                for signature, (chunk, entities) in representatives.items()
+            }
             
-            chunk_relations = self.extract_relations_from_chunk(chunk, entities)
+            for i, future in enumerate(as_completed(futures)):
+                if (i + 1) % 50 == 0:
+                    logger.info(f"Processado {i + 1}/{len(futures)} chunks...")
+                results[futures[future]] = future.result()
+        
+        # Manter a ordem original dos chunks, replicando resultados dos duplicados
+        all_relations = []
+        for chunk, signature in ordered:
+            chunk_relations = results[signature]
+            if representatives[signature][0] is not chunk:
+                chunk_relations = [replace(r, chunk_id=chunk.chunk_id) for r in chunk_relations]
+                self.stats['duplicate_chunks'] += 1
+                self.stats['chunks_processed'] += 1
+                self.stats['relations_extracted'] += len(chunk_relations)
             all_relations.extend(chunk_relations)
         
         logger.info(f"✅ Extração de relações concluída!")
@@ -385,6 +629,12 @@ Important:
         
         return all_relations
     
+    def close(self):
+        """Libera os recursos do extrator (conexão do cache de respostas)."""
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+    
     def get_statistics(self) -> Dict:
         """Retorna estatísticas da extração de relações."""
         avg_relations_per_chunk = 0
@@ -409,29 +659,34 @@ Important:
         if not relations:
             return {}
         
-        # Contar por predicado
-        predicate_counts = defaultdict(int)
-        subject_counts = defaultdict(int)
-        object_counts = defaultdict(int)
+        # Colunas (struct-of-arrays) das relações
+        predicates = [r.predicate for r in relations]
+        subjects = [r.subject for r in relations]
+        objects = [r.object for r in relations]
         
-        for relation in relations:
-            predicate_counts[relation.predicate] += 1
-            subject_counts[relation.subject] += 1
-            object_counts[relation.object] += 1
+        # Contar por predicado, subject e object
+        predicate_counts = Counter(predicates)
+        subject_counts = Counter(subjects)
+        object_counts = Counter(objects)
         
         # Top predicados
-        top_predicates = sorted(predicate_counts.items(), key=lambda x: x[1], reverse=True)
+        top_predicates = predicate_counts.most_common()
         
         # Top entidades como subject
-        top_subjects = sorted(subject_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        top_subjects = subject_counts.most_common(10)
         
         # Top entidades como object
-        top_objects = sorted(object_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        top_objects = object_counts.most_common(10)
+        
+        # Agrupar relações por predicado em uma única passada
+        by_predicate = defaultdict(list)
+        for relation in relations:
+            by_predicate[relation.predicate].append(relation)
         
         # Exemplo de relações por predicado
         predicate_examples = {}
         for predicate, count in top_predicates[:10]:
-            examples = [r for r in relations if r.predicate == predicate][:3]
+            examples = by_predicate[predicate][:3]
             predicate_examples[predicate] = [
                 f"{ex.subject} {ex.predicate} {ex.object}"
                 for ex in examples
@@ -469,6 +724,67 @@ def load_normalized_entities() -> Dict:
     return data['normalized_entities']
 
 
+def save_relations(file_path, relations: List[Relation], **metadata) -> Path:
+    """
+    Salva relações em pickle como tuplas de campos em vez de objetos.
+    
+    Tuplas evitam gravar nomes de campos por instância no pickle, gerando
+    arquivos menores e carga mais rápida.
+    
+    Args:
+        file_path: Caminho do arquivo de saída
+        relations: Lista de relações
+        **metadata: Dados adicionais salvos junto (estatísticas, resumo, ...)
+        
+    Returns:
+        Caminho do arquivo salvo
+    """
+    file_path = Path(file_path)
+    rows = [
+        (r.subject, r.predicate, r.object, r.chunk_id, r.confidence, r.context)
+        for r in relations
+    ]
+    
+    with open(file_path, 'wb') as f:
+        pickle.dump({'relations': rows, **metadata}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    return file_path
+
+
+def relations_from_data(data: Dict) -> List[Relation]:
+    """
+    Reconstrói as relações de um dicionário carregado com save_relations.
+    
+    Também aceita o formato antigo, com objetos Relation já serializados.
+    
+    Args:
+        data: Dicionário carregado do pickle
+        
+    Returns:
+        Lista de relações
+    """
+    rows = data['relations']
+    if rows and isinstance(rows[0], Relation):
+        return rows
+    return [Relation(*row) for row in rows]
+
+
+def load_relations(file_path) -> List[Relation]:
+    """
+    Carrega relações salvas com save_relations.
+    
+    Args:
+        file_path: Caminho do arquivo pickle
+        
+    Returns:
+        Lista de relações
+    """
+    with open(file_path, 'rb') as f:
+        data = pickle.load(f)
+    
+    return relations_from_data(data)
+
+
 def map_entities_to_chunks(normalized_entities: Dict) -> Dict[str, List[str]]:
     """
     Mapeia entidades normalizadas para seus chunks de origem.
@@ -485,11 +801,15 @@ def map_entities_to_chunks(normalized_entities: Dict) -> Dict[str, List[str]]:
         for chunk_id in entity_data.source_chunks:
             chunks_entities[chunk_id].append(entity_name)
     
-    # Filtrar chunks com pelo menos 2 entidades
-    chunks_entities = {k: v for k, v in chunks_entities.items() if len(v) >= 2}
+    # Filtrar chunks com pelo menos 2 entidades (in-place, sem reconstruir o dict)
+    for chunk_id in [k for k, v in chunks_entities.items() if len(v) < 2]:
+        del chunks_entities[chunk_id]
+    
+    # Desativar a fábrica padrão: o resultado passa a se comportar como dict comum
+    chunks_entities.default_factory = None
     
     logger.info(f"Mapeados {len(chunks_entities)} chunks com 2+ entidades")
-    return dict(chunks_entities)
+    return chunks_entities
 
 
 def extract_relations(max_chunks: int = None) -> Tuple[List[Relation], Dict, Dict]:
@@ -511,7 +831,10 @@ def extract_relations(max_chunks: int = None) -> Tuple[List[Relation], Dict, Dic
     
     # Extrair relações
     extractor = RelationExtractor()
-    relations = extractor.extract_relations_from_chunks(chunks_entities, max_chunks)
+    try:
+        relations = extractor.extract_relations_from_chunks(chunks_entities, max_chunks)
+    finally:
+        extractor.close()
     stats = extractor.get_statistics()
     summary = extractor.get_relations_summary(relations)
     
@@ -554,13 +877,13 @@ if __name__ == "__main__":
         output_file = Path("data/relations_sample.pkl")
         print(f"\n💾 Salvando amostra em: {output_file}")
         
-        with open(output_file, 'wb') as f:
-            pickle.dump({
-                'relations': relations,
-                'statistics': stats,
-                'summary': summary,
-                'sample_size': 10
-            }, f)
+        save_relations(
+            output_file,
+            relations,
+            statistics=stats,
+            summary=summary,
+            sample_size=10
+        )
         
         print(f"✅ Teste concluído! Arquivo: {output_file}")
         
@@ -7,105 +7,131 @@ import os
 import re
 from pathlib import Path
 import time
+import multiprocessing as mp
+
+# Padrão para detectar fim de sentenças. O lookbehind faz o match começar
+# apenas no início de uma sequência de pontuação, evitando o backtracking
+# quadrático em sequências longas sem espaço (ex.: pontilhados de sumário)
+_SENT_RE = re.compile(r'(?<![.!?])[.!?]+(?:\s+|$)')
+# Padrão de palavra (sequência sem espaços)
+_WORD_RE = re.compile(r'\S+')
+
+def iter_sentences(text):
+    """Gera sentenças do texto sob demanda (mesma divisão de simple_sentence_split)"""
+    start = 0
+    for match in _SENT_RE.finditer(text):
+        sentence = text[start:match.start()].strip()
+        start = match.end()
+        # Filtrar sentenças vazias e muito pequenas
+        if len(sentence) > 20:
+            yield sentence
+    
+    sentence = text[start:].strip()
+    if len(sentence) > 20:
+        yield sentence
 
 def simple_sentence_split(text):
     """Divisão simples de sentenças usando regex"""
-    # Padrão para detectar fim de sentenças
-    sentence_endings = r'[.!?]+(?:\s+|$)'
-    sentences = re.split(sentence_endings, text)
-    # Filtrar sentenças vazias e muito pequenas
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-    return sentences
+    return list(iter_sentences(text))
 
-def create_chunks(text, target_words=350, max_words=500):
+def count_words(text):
+    """Conta palavras sem materializar a lista de tokens"""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+def create_chunks(sentences, target_words=350, max_words=500):
     """
     Cria chunks inteligentes baseados em sentenças
     
     Args:
-        text: texto completo
+        sentences: iterável de sentenças (ex.: iter_sentences(texto))
         target_words: tamanho alvo do chunk em palavras
         max_words: tamanho máximo do chunk
     
     Returns:
         lista de chunks
     """
-    # Dividir em sentenças
-    sentences = simple_sentence_split(text)
-    
     chunks = []
-    current_chunk = []
-    current_words = 0
+    current_words_list = []  # palavras do chunk atual (cada sentença é dividida uma única vez)
     
     for sentence in sentences:
-        sentence_words = len(sentence.split())
+        words = sentence.split()
+        sentence_words = len(words)
         
         # Se a sentença sozinha já ultrapassa o máximo, dividir ela
         if sentence_words > max_words:
             # Salvar chunk atual se não estiver vazio
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = []
-                current_words = 0
+            if current_words_list:
+                chunks.append(' '.join(current_words_list))
+                current_words_list = []
             
             # Dividir sentença longa em partes menores
-            words = sentence.split()
-            for i in range(0, len(words), target_words):
-                chunk_part = ' '.join(words[i:i + target_words])
-                chunks.append(chunk_part)
+            for i in range(0, sentence_words, target_words):
+                chunks.append(' '.join(words[i:i + target_words]))
             continue
         
         # Se adicionar esta sentença ultrapassaria o limite, finalizar chunk atual
-        if current_words + sentence_words > max_words and current_chunk:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [sentence]
-            current_words = sentence_words
+        if len(current_words_list) + sentence_words > max_words and current_words_list:
+            chunks.append(' '.join(current_words_list))
+            current_words_list = words
         else:
-            current_chunk.append(sentence)
-            current_words += sentence_words
+            current_words_list.extend(words)
         
         # Se chegou ao tamanho alvo, finalizar chunk
-        if current_words >= target_words:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = []
-            current_words = 0
+        if len(current_words_list) >= target_words:
+            chunks.append(' '.join(current_words_list))
+            current_words_list = []
     
     # Adicionar último chunk se não estiver vazio
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+    if current_words_list:
+        chunks.append(' '.join(current_words_list))
     
     return chunks
 
 def process_text_file(file_path, output_dir, target_words=350):
-    """Processa um arquivo de texto e cria chunks"""
+    """
+    Processa um arquivo de texto e cria chunks
+    
+    Não imprime nada: as mensagens de progresso são devolvidas para que o
+    processo principal as exiba sem intercalar saídas de vários workers.
+    
+    Returns:
+        (número de chunks, total de palavras, relatório em texto)
+    """
     filename = os.path.basename(file_path)
-    print(f"\n📖 Processando: {filename}")
+    report = [f"\n📖 Processando: {filename}"]
     
     # Ler arquivo
     with open(file_path, 'r', encoding='utf-8') as f:
         text = f.read()
     
-    original_words = len(text.split())
-    print(f"   📊 Texto original: {len(text):,} chars, {original_words:,} palavras")
+    original_words = count_words(text)
+    report.append(f"   📊 Texto original: {len(text):,} chars, {original_words:,} palavras")
     
-    # Criar chunks
+    # Criar chunks (sentenças geradas sob demanda; o gerador é o único dono do texto)
     start_time = time.time()
-    chunks = create_chunks(text, target_words=target_words)
+    sentences = iter_sentences(text)
+    del text
+    chunks = create_chunks(sentences, target_words=target_words)
     elapsed = time.time() - start_time
     
-    print(f"   ✂️  Criados {len(chunks)} chunks em {elapsed:.1f}s")
+    report.append(f"   ✂️  Criados {len(chunks)} chunks em {elapsed:.1f}s")
     
     # Salvar chunks
     base_name = Path(file_path).stem
     chunks_file = output_dir / f"{base_name}_chunks.txt"
     
-    with open(chunks_file, 'w', encoding='utf-8') as f:
-        for i, chunk in enumerate(chunks, 1):
-            f.write(f"=== CHUNK {i:03d} ===\n")
-            f.write(f"Palavras: {len(chunk.split())}\n")
-            f.write(f"Caracteres: {len(chunk)}\n")
-            f.write("-" * 50 + "\n")
-            f.write(chunk)
-            f.write("\n\n" + "="*60 + "\n\n")
+    # Montar todo o conteúdo e gravar com uma única escrita
+    separator = "-" * 50
+    footer = "=" * 60
+    parts = [
+        f"=== CHUNK {i:03d} ===\n"
+        f"Palavras: {len(chunk.split())}\n"
+        f"Caracteres: {len(chunk)}\n"
+        f"{separator}\n"
+        f"{chunk}\n\n{footer}\n\n"
+        for i, chunk in enumerate(chunks, 1)
+    ]
+    chunks_file.write_text(''.join(parts), encoding='utf-8')
     
     # Estatísticas dos chunks
     chunk_sizes = [len(chunk.split()) for chunk in chunks]
@@ -113,10 +139,17 @@ def process_text_file(file_path, output_dir, target_words=350):
     min_size = min(chunk_sizes)
     max_size = max(chunk_sizes)
     
-    print(f"   💾 Salvo: {chunks_file.name}")
-    print(f"   📈 Stats: {avg_size:.0f} palavras/chunk (min:{min_size}, max:{max_size})")
+    report.append(f"   💾 Salvo: {chunks_file.name}")
+    report.append(f"   📈 Stats: {avg_size:.0f} palavras/chunk (min:{min_size}, max:{max_size})")
     
-    return len(chunks), sum(chunk_sizes)
+    return len(chunks), sum(chunk_sizes), '\n'.join(report)
+
+def _process_text_file_safe(file_path, output_dir, target_words=350):
+    """Versão de process_text_file para workers: captura erros em vez de propagar"""
+    try:
+        return process_text_file(file_path, output_dir, target_words), None
+    except Exception as e:
+        return None, str(e)
 
 def main():
     # Diretórios
@@ -139,14 +172,21 @@ def main():
     total_words = 0
     start_total = time.time()
     
-    for i, txt_file in enumerate(txt_files, 1):
+    # Processar arquivos em paralelo (um processo por núcleo)
+    with mp.Pool(os.cpu_count()) as pool:
+        results = pool.starmap(_process_text_file_safe, [(f, output_dir, 350) for f in txt_files])
+    
+    for i, (txt_file, (result, error)) in enumerate(zip(txt_files, results), 1):
         print(f"\n[{i}/{len(txt_files)}]", end="")
-        try:
-            chunks_count, words_count = process_text_file(txt_file, output_dir)
-            total_chunks += chunks_count
-            total_words += words_count
-        except Exception as e:
-            print(f"   ❌ Erro: {e}")
+        if error is not None:
+            print(f"\n📖 Processando: {txt_file.name}")
+            print(f"   ❌ Erro: {error}")
+            continue
+        
+        chunks_count, words_count, report = result
+        print(report)
+        total_chunks += chunks_count
+        total_words += words_count
     
     elapsed_total = time.time() - start_total
     
@@ -3,10 +3,30 @@
 Script para extração completa de texto dos PDFs
 """
 
+import hashlib
+import io
+import json
+import logging
+import logging.handlers
+import math
+import multiprocessing as mp
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import time
 
+# Máximo de PDFs submetidos ao pool por vez (limita memória em lotes grandes)
+SUBMIT_BATCH_SIZE = 1000
+
+_WORD_RE = re.compile(r'\S+')
+
+# Hashes dos PDFs já extraídos (pula arquivos sem alteração)
+HASHES_FILENAME = ".hashes.json"
+
+# PDFs com mais páginas que isso têm as páginas extraídas em paralelo
+PAGE_PARALLEL_THRESHOLD = 50
+
 # Tentar diferentes bibliotecas
 try:
     import PyPDF2
@@ -17,81 +37,193 @@ except ImportError:
 try:
     import fitz  # PyMuPDF
     PYMUPDF_AVAILABLE = True
+    # Texto simples sem ordenação por layout; junta palavras hifenizadas na quebra de linha
+    PYMUPDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_DEHYPHENATE
 except ImportError:
     PYMUPDF_AVAILABLE = False
 
-def extract_full_pypdf2(pdf_path):
-    """Extrai todo o texto com PyPDF2"""
+# Progresso por página só com EXTRACT_VERBOSE=1
+VERBOSE = os.getenv("EXTRACT_VERBOSE", "0") == "1"
+LOG_LEVEL = logging.DEBUG if VERBOSE else logging.INFO
+
+logger = logging.getLogger(__name__)
+
+# Fila de logs do processo pai (definida nos workers pelo initializer do pool)
+_LOG_QUEUE = None
+
+# Backend tentado primeiro: "pymupdf" (padrão) ou "pypdf2"
+PREFERRED_PDF_BACKEND = os.getenv("PREFERRED_PDF_BACKEND", "pymupdf").lower()
+
+def _init_worker(log_queue):
+    """
+    Initializer dos workers: envia os logs para a fila do processo pai,
+    que os escreve em um único lugar (sem disputa pelo stdout entre processos)
+    """
+    global _LOG_QUEUE
+    _LOG_QUEUE = log_queue
+    
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+def _page_ranges(n_pages, workers):
+    """Divide as páginas em intervalos [início, fim) de tamanho parecido"""
+    size = math.ceil(n_pages / workers)
+    return [(start, min(start + size, n_pages)) for start in range(0, n_pages, size)]
+
+def _extract_range_pypdf2(pdf_path, start, end):
+    """Extrai um intervalo de páginas com PyPDF2 (abre o próprio reader no worker)"""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return start, "\n".join(reader.pages[i].extract_text() or "" for i in range(start, end))
+
+def _extract_range_pymupdf(pdf_path, start, end):
+    """Extrai um intervalo de páginas com PyMuPDF (documento não é compartilhado entre processos)"""
+    doc = fitz.open(pdf_path)
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            
-            print(f"   📄 Total de páginas: {len(reader.pages)}")
-            
-            for i, page in enumerate(reader.pages):
-                if i % 50 == 0:  # Progress update every 50 pages
-                    print(f"   📖 Processando página {i+1}/{len(reader.pages)}")
-                
-                page_text = page.extract_text()
-                text += page_text + "\n"
+        return start, "\n".join(doc[i].get_text("text", flags=PYMUPDF_TEXT_FLAGS, sort=False) for i in range(start, end))
+    finally:
+        doc.close()
+
+def _extract_pages_parallel(extract_range, pdf_path, n_pages, workers):
+    """Extrai as páginas em intervalos distribuídos entre processos e junta em ordem"""
+    ranges = _page_ranges(n_pages, workers)
+    logger.info(f"   ⚡ Extraindo {n_pages} páginas em {len(ranges)} processos")
+    
+    # Workers de página também logam pela fila do pai, quando existir
+    pool_kwargs = {"initializer": _init_worker, "initargs": (_LOG_QUEUE,)} if _LOG_QUEUE is not None else {}
+    
+    with ProcessPoolExecutor(max_workers=len(ranges), **pool_kwargs) as pool:
+        futures = [pool.submit(extract_range, str(pdf_path), start, end) for start, end in ranges]
+        results = sorted(future.result() for future in futures)
+    
+    return "\n".join(text for _, text in results)
+
+def extract_full_pypdf2(pdf_path, workers=None, data=None):
+    """Extrai todo o texto com PyPDF2 (data: conteúdo do PDF já lido, evita reabrir o arquivo)"""
+    workers = workers or os.cpu_count()
+    try:
+        reader = PyPDF2.PdfReader(io.BytesIO(data) if data is not None else pdf_path)
+        n_pages = len(reader.pages)
+        
+        logger.info(f"   📄 Total de páginas: {n_pages}")
+        
+        if n_pages > PAGE_PARALLEL_THRESHOLD and workers > 1:
+            return _extract_pages_parallel(_extract_range_pypdf2, pdf_path, n_pages, workers).strip()
+        
+        parts = []
+        
+        for i, page in enumerate(reader.pages):
+            if i % 50 == 0:  # Progress update every 50 pages
+                logger.debug(f"   📖 Processando página {i+1}/{n_pages}")
             
-            return text.strip()
+            parts.append(page.extract_text() or "")
+        
+        return "\n".join(parts).strip()
     except Exception as e:
-        print(f"   ❌ Erro PyPDF2: {e}")
+        logger.error(f"   ❌ Erro PyPDF2: {e}")
         return None
 
-def extract_full_pymupdf(pdf_path):
-    """Extrai todo o texto com PyMuPDF"""
+def extract_full_pymupdf(pdf_path, workers=None, data=None):
+    """Extrai todo o texto com PyMuPDF (data: conteúdo do PDF já lido, evita reabrir o arquivo)"""
+    workers = workers or os.cpu_count()
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
+        doc = fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(pdf_path)
+        n_pages = doc.page_count
+        
+        logger.info(f"   📄 Total de páginas: {n_pages}")
         
-        print(f"   📄 Total de páginas: {doc.page_count}")
+        if n_pages > PAGE_PARALLEL_THRESHOLD and workers > 1:
+            doc.close()
+            return _extract_pages_parallel(_extract_range_pymupdf, pdf_path, n_pages, workers).strip()
         
-        for i in range(doc.page_count):
+        parts = []
+        
+        for i in range(n_pages):
             if i % 50 == 0:  # Progress update every 50 pages
-                print(f"   📖 Processando página {i+1}/{doc.page_count}")
+                logger.debug(f"   📖 Processando página {i+1}/{n_pages}")
             
-            page = doc[i]
-            page_text = page.get_text()
-            text += page_text + "\n"
+            parts.append(doc[i].get_text("text", flags=PYMUPDF_TEXT_FLAGS, sort=False))
         
         doc.close()
-        return text.strip()
+        return "\n".join(parts).strip()
     except Exception as e:
-        print(f"   ❌ Erro PyMuPDF: {e}")
+        logger.error(f"   ❌ Erro PyMuPDF: {e}")
         return None
 
-def extract_full_from_pdf(pdf_path):
-    """Extrai todo o texto do PDF usando as bibliotecas disponíveis"""
+def _backends_in_order():
+    """Backends disponíveis, começando pelo preferido (PyMuPDF por padrão, mais rápido)"""
+    backends = []
+    if PYMUPDF_AVAILABLE:
+        backends.append(("PyMuPDF", extract_full_pymupdf))
+    if PYPDF2_AVAILABLE:
+        backends.append(("PyPDF2", extract_full_pypdf2))
+    
+    if PREFERRED_PDF_BACKEND == "pypdf2":
+        backends.reverse()
+    return backends
+
+def extract_full_from_pdf(pdf_path, page_workers=None):
+    """
+    Extrai todo o texto do PDF usando as bibliotecas disponíveis
+    
+    page_workers: processos para extrair páginas de PDFs grandes (padrão: núcleos da CPU)
+    """
     filename = os.path.basename(pdf_path)
-    print(f"\n📖 Processando: {filename}")
+    logger.info(f"\n📖 Processando: {filename}")
     
     start_time = time.time()
     
-    # Tentar PyPDF2 primeiro
-    if PYPDF2_AVAILABLE:
-        print("   🔧 Usando PyPDF2...")
-        text = extract_full_pypdf2(pdf_path)
-        if text and len(text.strip()) > 1000:  # Minimum threshold for valid extraction
-            elapsed = time.time() - start_time
-            print(f"   ✅ Sucesso: {len(text):,} caracteres em {elapsed:.1f}s")
-            return text
+    # Ler o PDF uma vez; os backends parseiam da memória
+    data = Path(pdf_path).read_bytes()
     
-    # Tentar PyMuPDF se PyPDF2 falhou
-    if PYMUPDF_AVAILABLE:
-        print("   🔧 Tentando PyMuPDF como fallback...")
-        text = extract_full_pymupdf(pdf_path)
-        if text and len(text.strip()) > 1000:
+    # Tentar o backend preferido primeiro e o outro como fallback
+    for name, extract in _backends_in_order():
+        logger.info(f"   🔧 Usando {name}...")
+        text = extract(pdf_path, page_workers, data)
+        if text and len(text.strip()) > 1000:  # Minimum threshold for valid extraction
             elapsed = time.time() - start_time
-            print(f"   ✅ Sucesso: {len(text):,} caracteres em {elapsed:.1f}s")
+            logger.info(f"   ✅ Sucesso: {len(text):,} caracteres em {elapsed:.1f}s")
             return text
     
-    print("   ❌ Falha na extração completa")
+    logger.error("   ❌ Falha na extração completa")
     return None
 
+def _file_sha256(path):
+    """SHA-256 do conteúdo do arquivo, lido em blocos de 1 MiB"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _process_one(pdf_path, output_dir, page_workers=1):
+    """Extrai um PDF e salva o .txt; retorna (nome do arquivo, caracteres salvos)"""
+    # Extrair texto completo
+    full_text = extract_full_from_pdf(pdf_path, page_workers)
+    
+    if not full_text:
+        logger.error(f"   ❌ Falha ao processar {pdf_path.name}")
+        return pdf_path.name, 0
+    
+    # Criar nome do arquivo de saída
+    output_file = output_dir / f"{pdf_path.stem}.txt"
+    
+    # Salvar texto (codificado uma vez, escrita binária direta)
+    with open(output_file, 'wb', buffering=1 << 20) as f:
+        f.write(full_text.encode('utf-8'))
+    
+    chars_count = len(full_text)
+    words_count = sum(1 for _ in _WORD_RE.finditer(full_text))  # sem materializar a lista de tokens
+    
+    logger.info(f"   💾 Salvo: {output_file.name}")
+    logger.info(f"   📊 Stats: {chars_count:,} chars, {words_count:,} palavras")
+    
+    return pdf_path.name, chars_count
+
 def main():
+    logging.basicConfig(level=LOG_LEVEL, format="%(message)s")
+    
     # Diretórios
     pdfs_dir = Path("data/raw_pdfs")
     output_dir = Path("data/processed_texts")
@@ -116,36 +248,63 @@ def main():
     
     start_total = time.time()
     
-    for i, pdf_path in enumerate(pdf_files, 1):
-        print(f"\n[{i}/{len(pdf_files)}] Processando arquivo...")
-        
-        # Extrair texto completo
-        full_text = extract_full_from_pdf(pdf_path)
-        
-        if full_text:
-            # Criar nome do arquivo de saída
-            output_file = output_dir / f"{pdf_path.stem}.txt"
-            
-            # Salvar texto
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(full_text)
-            
-            chars_count = len(full_text)
-            words_count = len(full_text.split())
-            
-            print(f"   💾 Salvo: {output_file.name}")
-            print(f"   📊 Stats: {chars_count:,} chars, {words_count:,} palavras")
-            
-            success_count += 1
-            total_chars += chars_count
-        else:
-            print(f"   ❌ Falha ao processar {pdf_path.name}")
+    # Pular PDFs cujo conteúdo não mudou desde a última extração
+    hashes_path = output_dir / HASHES_FILENAME
+    hashes = json.loads(hashes_path.read_text(encoding='utf-8')) if hashes_path.exists() else {}
+    
+    pending = {}
+    for pdf_path in pdf_files:
+        digest = _file_sha256(pdf_path)
+        output_file = output_dir / f"{pdf_path.stem}.txt"
+        if hashes.get(pdf_path.stem) == digest and output_file.exists():
+            continue
+        pending[pdf_path] = digest
+    
+    skipped_count = len(pdf_files) - len(pending)
+    if skipped_count:
+        print(f"⏭️  {skipped_count} PDFs sem alterações (extração pulada)")
+    
+    pending_files = list(pending)
+    
+    # Núcleos que sobram por PDF ficam para extrair páginas em paralelo
+    page_workers = max(1, os.cpu_count() // max(1, len(pending_files)))
+    
+    # Logs dos workers chegam por uma fila e são escritos só pelo processo pai
+    log_queue = mp.Queue()
+    listener = logging.handlers.QueueListener(log_queue, *logging.getLogger().handlers)
+    listener.start()
+    
+    # Processar PDFs em paralelo (um processo por núcleo)
+    try:
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker,
+                                 initargs=(log_queue,)) as pool:
+            for batch_start in range(0, len(pending_files), SUBMIT_BATCH_SIZE):
+                batch = pending_files[batch_start:batch_start + SUBMIT_BATCH_SIZE]
+                futures = {pool.submit(_process_one, p, output_dir, page_workers): p for p in batch}
+                
+                for future in as_completed(futures):
+                    pdf_path = futures[future]
+                    try:
+                        _, chars_count = future.result()
+                    except Exception as e:
+                        print(f"   ❌ Erro ao processar {pdf_path.name}: {e}")
+                        continue
+                    
+                    if chars_count:
+                        success_count += 1
+                        total_chars += chars_count
+                        hashes[pdf_path.stem] = pending[pdf_path]
+    finally:
+        listener.stop()
+    
+    hashes_path.write_text(json.dumps(hashes, indent=2), encoding='utf-8')
     
     elapsed_total = time.time() - start_total
     
     print(f"\n" + "="*50)
     print(f"=== RESUMO FINAL ===")
-    print(f"✅ {success_count}/{len(pdf_files)} PDFs processados com sucesso")
+    print(f"✅ {success_count}/{len(pending_files)} PDFs processados com sucesso")
+    print(f"⏭️  {skipped_count} PDFs sem alterações")
     print(f"📊 Total: {total_chars:,} caracteres extraídos")
     print(f"⏱️  Tempo total: {elapsed_total:.1f} segundos")
     print(f"📁 Arquivos salvos em: {output_dir}")
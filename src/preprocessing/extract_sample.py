@@ -3,6 +3,7 @@
 Script simples para extrair uma amostra pequena de cada PDF
 """
 
+import io
 import os
 from pathlib import Path
 
@@ -19,63 +20,64 @@ try:
 except ImportError:
     PYMUPDF_AVAILABLE = False
 
-def extract_sample_pypdf2(pdf_path, max_pages=3):
-    """Extrai primeiras páginas com PyPDF2"""
+# Backend tentado primeiro: "pymupdf" (padrão) ou "pypdf2"
+PREFERRED_PDF_BACKEND = os.getenv("PREFERRED_PDF_BACKEND", "pymupdf").lower()
+
+def extract_sample_pypdf2(pdf_path, max_pages=3, data=None):
+    """Extrai primeiras páginas com PyPDF2 (data: conteúdo do PDF já lido)"""
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            
-            # Extrair no máximo as primeiras 3 páginas
-            pages_to_extract = min(len(reader.pages), max_pages)
-            
-            for i in range(pages_to_extract):
-                page = reader.pages[i]
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
+        reader = PyPDF2.PdfReader(io.BytesIO(data) if data is not None else pdf_path)
+        # Extrair no máximo as primeiras 3 páginas
+        pages_to_extract = min(len(reader.pages), max_pages)
+        
+        parts = [reader.pages[i].extract_text() or "" for i in range(pages_to_extract)]
+        
+        return "\n".join(parts).strip()
     except Exception as e:
         print(f"Erro PyPDF2: {e}")
         return None
 
-def extract_sample_pymupdf(pdf_path, max_pages=3):
-    """Extrai primeiras páginas com PyMuPDF"""
+def extract_sample_pymupdf(pdf_path, max_pages=3, data=None):
+    """Extrai primeiras páginas com PyMuPDF (data: conteúdo do PDF já lido)"""
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        
+        doc = fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(pdf_path)
         # Extrair no máximo as primeiras 3 páginas
         pages_to_extract = min(doc.page_count, max_pages)
         
-        for i in range(pages_to_extract):
-            page = doc[i]
-            text += page.get_text() + "\n"
+        parts = [doc[i].get_text() for i in range(pages_to_extract)]
         
         doc.close()
-        return text.strip()
+        return "\n".join(parts).strip()
     except Exception as e:
         print(f"Erro PyMuPDF: {e}")
         return None
 
+def _backends_in_order():
+    """Backends disponíveis, começando pelo preferido (PyMuPDF por padrão, mais rápido)"""
+    backends = []
+    if PYMUPDF_AVAILABLE:
+        backends.append(("PyMuPDF", extract_sample_pymupdf))
+    if PYPDF2_AVAILABLE:
+        backends.append(("PyPDF2", extract_sample_pypdf2))
+    
+    if PREFERRED_PDF_BACKEND == "pypdf2":
+        backends.reverse()
+    return backends
+
 def extract_sample_from_pdf(pdf_path):
     """Tenta extrair amostra do PDF usando as bibliotecas disponíveis"""
     filename = os.path.basename(pdf_path)
     print(f"\n📖 Processando: {filename}")
     
-    # Tentar PyPDF2 primeiro
-    if PYPDF2_AVAILABLE:
-        print("   Tentando PyPDF2...")
-        text = extract_sample_pypdf2(pdf_path)
-        if text and len(text.strip()) > 100:
-            print(f"   ✅ PyPDF2: {len(text)} caracteres extraídos")
-            return text
+    # Ler o PDF uma vez; os backends parseiam da memória
+    data = Path(pdf_path).read_bytes()
     
-    # Tentar PyMuPDF se PyPDF2 falhou
-    if PYMUPDF_AVAILABLE:
-        print("   Tentando PyMuPDF...")
-        text = extract_sample_pymupdf(pdf_path)
+    # Tentar o backend preferido primeiro e o outro como fallback
+    for name, extract in _backends_in_order():
+        print(f"   Tentando {name}...")
+        text = extract(pdf_path, data=data)
         if text and len(text.strip()) > 100:
-            print(f"   ✅ PyMuPDF: {len(text)} caracteres extraídos")
+            print(f"   ✅ {name}: {len(text)} caracteres extraídos")
             return text
     
     print("   ❌ Falha na extração")
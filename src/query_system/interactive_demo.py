@@ -5,8 +5,15 @@ Interactive Demo: Interface interativa para testar o sistema de consultas
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Edição de linha e histórico no input() (indisponível no Windows)
+try:
+    import readline  # noqa: F401
+except ImportError:
+    pass
+
 # Adiciona o diretório src ao path para imports
 current_dir = Path(__file__).parent
 project_root = current_dir.parent.parent
@@ -24,28 +31,43 @@ class InteractiveDemo:
         print("=" * 60)
         
         try:
-            print("🔧 Carregando KG Executor...")
-            self.kg_executor = create_kg_executor(kg_path)
-            
-            print("🧠 Carregando Query Processor...")
-            self.query_processor = create_query_processor()
-            
-            print("🎨 Carregando Response Formatter...")
-            self.response_formatter = create_response_formatter()
-            
-            print("🤖 Carregando Response Enhancer (LLM)...")
-            self.response_enhancer = create_response_enhancer()
+            # Componentes são independentes: carregar em paralelo sobrepõe o
+            # parse do KG com a conexão ao LLM
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                print("🔧 Carregando KG Executor...")
+                f_kg = pool.submit(create_kg_executor, kg_path)
+                
+                print("🧠 Carregando Query Processor...")
+                f_qp = pool.submit(create_query_processor)
+                
+                print("🎨 Carregando Response Formatter...")
+                f_rf = pool.submit(create_response_formatter)
+                
+                print("🤖 Carregando Response Enhancer (LLM)...")
+                f_re = pool.submit(create_response_enhancer)
+                
+                self.kg_executor = f_kg.result()
+                self.query_processor = f_qp.result()
+                self.response_formatter = f_rf.result()
+                self.response_enhancer = f_re.result()
             
-            stats = self.kg_executor.get_stats()
+            # O KG não muda durante a sessão: estatísticas calculadas uma vez
+            self._stats_cache = self.kg_executor.get_stats()
             print(f"✅ Sistema carregado com sucesso!")
-            print(f"📊 Knowledge Graph: {stats.get('total_triples', 'N/A')} triplas")
+            print(f"📊 Knowledge Graph: {self._stats_cache.get('total_triples', 'N/A')} triplas")
             print("=" * 60)
             
         except Exception as e:
             print(f"❌ Erro ao carregar sistema: {e}")
             raise
     
-    def process_question(self, question, show_debug=False, use_natural_language=True):
+    def process_question(self, question, show_debug=False, use_natural_language=True, stream=False):
+        """
+        Responde uma pergunta e retorna o texto a exibir
+        
+        Com stream=True a resposta natural é impressa à medida que o LLM gera
+        os tokens, e o texto retornado traz só o rodapé (fonte, tempo, etc.)
+        """
         start_time = time.time()
         
         try:
@@ -74,14 +96,28 @@ class InteractiveDemo:
             # Nova funcionalidade: Enhancement com LLM
             if use_natural_language:
                 try:
-                    enhanced_response = self.response_enhancer.enhance_response(
-                        formatted_response=formatted_response,
-                        original_question=question,
-                        query_type=intent.query_type.value
-                    )
-                    
-                    main_answer = enhanced_response.natural_answer
-                    llm_time = enhanced_response.processing_time
+                    if stream:
+                        llm_start = time.time()
+                        for chunk in self.response_enhancer.enhance_response_stream(
+                            formatted_response=formatted_response,
+                            original_question=question,
+                            query_type=intent.query_type.value
+                        ):
+                            print(chunk, end="", flush=True)
+                        print()
+                        
+                        # Já impressa durante a geração
+                        main_answer = None
+                        llm_time = time.time() - llm_start
+                    else:
+                        enhanced_response = self.response_enhancer.enhance_response(
+                            formatted_response=formatted_response,
+                            original_question=question,
+                            query_type=intent.query_type.value
+                        )
+                        
+                        main_answer = enhanced_response.natural_answer
+                        llm_time = enhanced_response.processing_time
                     
                     if show_debug:
                         print(f"🤖 LLM Enhancement: {llm_time:.2f}s")
@@ -98,8 +134,8 @@ class InteractiveDemo:
             
             elapsed_time = time.time() - start_time
             
-            response_parts = [
-                main_answer,
+            response_parts = [] if main_answer is None else [main_answer]
+            response_parts += [
                 "",
                 f"🔗 **Fonte**: Knowledge Graph ML/DL",
                 f"⏱️ **Tempo**: {elapsed_time:.2f}s" + (f" (LLM: {llm_time:.2f}s)" if llm_time > 0 else ""),
@@ -180,7 +216,8 @@ class InteractiveDemo:
                     print("\n🤖 **Resposta:**")
                     print("-" * 40)
                     
-                    response = self.process_question(question, show_debug=debug_mode, use_natural_language=natural_mode)
+                    response = self.process_question(question, show_debug=debug_mode,
+                                                     use_natural_language=natural_mode, stream=True)
                     print(response)
                     
             except KeyboardInterrupt:
@@ -208,7 +245,7 @@ class InteractiveDemo:
             print(f"\n📝 **Pergunta {i}**: {question}")
             print("-" * 30)
             
-            response = self.process_question(question)
+            response = self.process_question(question, stream=True)
             print(response)
             
             input("\n⏎ Pressione Enter para continuar...")
@@ -253,7 +290,7 @@ class InteractiveDemo:
     
     def _show_stats(self):
         try:
-            stats = self.kg_executor.get_stats()
+            stats = self._stats_cache
             
             print("\n📊 **Estatísticas do Knowledge Graph:**")
             print("-" * 35)
@@ -4,17 +4,28 @@ KG Executor: Motor de execução de consultas SPARQL no Knowledge Graph
 Este módulo é responsável por:
 1. Carregar o Knowledge Graph (ml_kg.turtle) 
 2. Executar consultas SPARQL
-3. Gerenciar cache para performance
+3. Gerenciar cache para performance (grafo parseado, resultados de consultas)
 4. Retornar resultados estruturados
 """
 
 import logging
+import pickle
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import rdflib
-from rdflib import Graph, Namespace
+from rdflib import Graph, Namespace, RDFS
 from rdflib.plugins.sparql import prepareQuery
 
+# Store Oxigraph (Rust) é opcional: SPARQL muito mais rápido que o store em Python
+try:
+    import oxrdflib  # noqa: F401 (registra o plugin de store "Oxigraph")
+    OXRDFLIB_AVAILABLE = True
+except ImportError:
+    OXRDFLIB_AVAILABLE = False
+
+# Máximo de consultas SPARQL com resultado em cache (o grafo é imutável após a carga)
+QUERY_CACHE_SIZE = 1024
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -51,7 +62,16 @@ class KGExecutor:
         
         # Inicializar grafo
         self.graph = None
+        self.store = "Oxigraph" if OXRDFLIB_AVAILABLE else "default"
         self._load_knowledge_graph()
+        self._count_graph_terms()
+        
+        # Cache de resultados por consulta e das estatísticas
+        self._query_cache: Dict[Any, List[Dict[str, Any]]] = {}
+        self._stats: Optional[Dict[str, int]] = None
+        
+        # Consultas frequentes pré-compiladas (parse e álgebra feitos uma vez)
+        self._prepare_queries()
     
     def _load_knowledge_graph(self) -> None:
         """
@@ -63,7 +83,20 @@ class KGExecutor:
         if not self.kg_path.exists():
             raise FileNotFoundError(f"Knowledge Graph não encontrado: {self.kg_path}")
         
-        self.graph = Graph()
+        # Cache do grafo já parseado, válido enquanto o .turtle não mudar
+        cache_path = self.kg_path.with_name(self.kg_path.name + ".pkl")
+        key_path = self.kg_path.with_name(self.kg_path.name + ".key")
+        kg_stat = self.kg_path.stat()
+        cache_key = f"{kg_stat.st_mtime_ns}-{kg_stat.st_size}"
+        
+        # O store Oxigraph já carrega rápido e não é serializável em pickle
+        use_cache = self.store == "default"
+        
+        if use_cache and self._load_cached_graph(cache_path, key_path, cache_key):
+            logger.info(f"✅ Knowledge Graph carregado do cache: {len(self.graph)} triplas")
+            return
+        
+        self.graph = Graph(store=self.store)
         
         try:
             # Bind namespaces para consultas mais legíveis
@@ -74,11 +107,83 @@ class KGExecutor:
             # Carrega o grafo (pode demorar alguns segundos)
             self.graph.parse(str(self.kg_path), format="turtle")
             
-            logger.info(f"✅ Knowledge Graph carregado: {len(self.graph)} triplas")
+            logger.info(f"✅ Knowledge Graph carregado: {len(self.graph)} triplas (store: {self.store})")
             
         except Exception as e:
             logger.error(f"❌ Erro ao carregar Knowledge Graph: {e}")
             raise
+        
+        if use_cache:
+            self._save_cached_graph(cache_path, key_path, cache_key)
+    
+    def _load_cached_graph(self, cache_path: Path, key_path: Path, cache_key: str) -> bool:
+        """
+        Carrega o grafo do cache pickle se a chave (mtime + tamanho do .turtle) bater
+        
+        Returns:
+            True se o grafo foi carregado do cache
+        """
+        try:
+            if not (cache_path.exists() and key_path.exists()) or key_path.read_text() != cache_key:
+                return False
+            with open(cache_path, 'rb') as f:
+                self.graph = pickle.load(f)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Cache do Knowledge Graph inválido, refazendo parse: {e}")
+            return False
+    
+    def _save_cached_graph(self, cache_path: Path, key_path: Path, cache_key: str) -> None:
+        """Salva o grafo parseado em pickle para as próximas inicializações"""
+        try:
+            with open(cache_path, 'wb') as f:
+                pickle.dump(self.graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+            key_path.write_text(cache_key)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível salvar cache do Knowledge Graph: {e}")
+    
+    def _count_graph_terms(self) -> None:
+        """
+        Conta entidades (sujeitos no namespace entity:) e triplas de relação
+        (predicados no namespace relation:) em uma única passada pelo grafo
+        """
+        entity_prefix = str(self.entity)
+        relation_prefix = str(self.relation)
+        
+        entities = set()
+        relation_count = 0
+        for subject, predicate, _ in self.graph:
+            if subject.startswith(entity_prefix):
+                entities.add(subject)
+            if predicate.startswith(relation_prefix):
+                relation_count += 1
+        
+        self._entity_count = len(entities)
+        self._relation_count = relation_count
+    
+    def _prepare_queries(self) -> None:
+        """
+        Pré-compila as consultas usadas por get_entity_info e get_related_entities
+        
+        A entidade (e o tipo de relação, quando informado) entram via initBindings.
+        """
+        init_ns = {"ml": self.ml, "entity": self.entity, "relation": self.relation, "rdfs": RDFS}
+        
+        self._q_entity_info = prepareQuery("""
+        SELECT ?property ?value WHERE {
+            ?entity ?property ?value .
+        }
+        """, initNs=init_ns)
+        
+        self._q_related_entities = prepareQuery("""
+        SELECT ?related ?relation ?label WHERE {
+            { ?entity ?relation ?related . }
+            UNION
+            { ?related ?relation ?entity . }
+            
+            OPTIONAL { ?related rdfs:label ?label . }
+        }
+        """, initNs=init_ns)
     
     def execute_sparql(self, query: str) -> List[Dict[str, Any]]:
         """
@@ -97,30 +202,61 @@ class KGExecutor:
         if self.graph is None:
             raise RuntimeError("Knowledge Graph não foi carregado")
         
-        logger.info(f"🔍 Executando consulta SPARQL...")
         logger.debug(f"Query: {query}")
+        return self._run_query(query, query)
+    
+    def _run_query(self, cache_key: Any, query: Any,
+                   init_bindings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Executa uma consulta (texto ou pré-compilada) usando o cache de resultados
+        
+        Args:
+            cache_key: Chave do resultado no cache
+            query: Consulta SPARQL (string ou resultado de prepareQuery)
+            init_bindings: Variáveis já ligadas para consultas pré-compiladas
+            
+        Returns:
+            Lista de resultados como dicionários
+        """
+        cached = self._query_cache.pop(cache_key, None)
+        if cached is not None:
+            # Reinsere no fim para manter a ordem LRU
+            self._query_cache[cache_key] = cached
+            logger.info(f"✅ Consulta em cache: {len(cached)} resultados")
+            return list(cached)
+        
+        logger.info(f"🔍 Executando consulta SPARQL...")
         
         try:
             # Executa a consulta
-            results = self.graph.query(query)
+            if init_bindings:
+                results = self.graph.query(query, initBindings=init_bindings)
+            else:
+                results = self.graph.query(query)
             
             # Converte resultados para formato estruturado
+            # (nomes das variáveis convertidos uma vez, não a cada linha)
+            var_names = [str(var) for var in results.vars]
             formatted_results = []
             for row in results:
                 result_dict = {}
-                for var_name in results.vars:
-                    value = row[var_name]
-                    if value:
-                        # Converte URIs para strings legíveis
-                        if hasattr(value, 'toPython'):
-                            result_dict[str(var_name)] = value.toPython()
-                        else:
-                            result_dict[str(var_name)] = str(value)
+                for var_name, value in zip(var_names, row):
+                    if value is None:
+                        continue
+                    # Converte URIs para strings legíveis
+                    try:
+                        result_dict[var_name] = value.toPython()
+                    except AttributeError:
+                        result_dict[var_name] = str(value)
                 
                 formatted_results.append(result_dict)
             
+            if len(self._query_cache) >= QUERY_CACHE_SIZE:
+                del self._query_cache[next(iter(self._query_cache))]
+            self._query_cache[cache_key] = formatted_results
+            
             logger.info(f"✅ Consulta executada: {len(formatted_results)} resultados")
-            return formatted_results
+            return list(formatted_results)
             
         except Exception as e:
             logger.error(f"❌ Erro na consulta SPARQL: {e}")
@@ -136,17 +272,11 @@ class KGExecutor:
         Returns:
             Dicionário com propriedades da entidade
         """
-        query = f"""
-        PREFIX ml: <{self.ml}>
-        PREFIX entity: <{self.entity}>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT ?property ?value WHERE {{
-            entity:{entity_name} ?property ?value .
-        }}
-        """
-        
-        results = self.execute_sparql(query)
+        results = self._run_query(
+            ('entity_info', entity_name),
+            self._q_entity_info,
+            {'entity': self.entity[entity_name]}
+        )
         return results
     
     def get_related_entities(self, entity_name: str, relation_type: str = None) -> List[Dict[str, Any]]:
@@ -160,28 +290,15 @@ class KGExecutor:
         Returns:
             Lista de entidades relacionadas
         """
+        init_bindings = {'entity': self.entity[entity_name]}
         if relation_type:
-            relation_filter = f"FILTER(?relation = relation:{relation_type})"
-        else:
-            relation_filter = ""
-        
-        query = f"""
-        PREFIX ml: <{self.ml}>
-        PREFIX entity: <{self.entity}>
-        PREFIX relation: <{self.relation}>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT ?related ?relation ?label WHERE {{
-            {{ entity:{entity_name} ?relation ?related . }}
-            UNION
-            {{ ?related ?relation entity:{entity_name} . }}
-            
-            OPTIONAL {{ ?related rdfs:label ?label . }}
-            {relation_filter}
-        }}
-        """
+            init_bindings['relation'] = self.relation[relation_type]
         
-        results = self.execute_sparql(query)
+        results = self._run_query(
+            ('related_entities', entity_name, relation_type),
+            self._q_related_entities,
+            init_bindings
+        )
         return results
     
     def get_stats(self) -> Dict[str, int]:
@@ -191,26 +308,15 @@ class KGExecutor:
         Returns:
             Dicionário com contagens de triplas, entidades, etc.
         """
-        stats = {
-            'total_triples': len(self.graph),
-            'total_entities': 0,
-            'total_relations': 0
-        }
-        
-        # Conta entidades únicas
-        entity_query = f"""
-        PREFIX entity: <{self.entity}>
-        SELECT (COUNT(DISTINCT ?entity) as ?count) WHERE {{
-            ?entity ?p ?o .
-            FILTER(STRSTARTS(STR(?entity), STR(entity:)))
-        }}
-        """
-        
-        results = self.execute_sparql(entity_query)
-        if results:
-            stats['total_entities'] = int(results[0]['count'])
+        if self._stats is None:
+            # Contagens feitas na carga do grafo; nenhuma consulta SPARQL necessária
+            self._stats = {
+                'total_triples': len(self.graph),
+                'total_entities': self._entity_count,
+                'total_relations': self._relation_count
+            }
         
-        return stats
+        return dict(self._stats)
 
 
 # Função utilitária para uso direto
@@ -12,19 +12,270 @@ Fluxo:
 5. Gera consulta SPARQL
 """
 
+import functools
+import itertools
 import re
 import logging
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 
-from .query_templates import QueryTemplates, QueryType, get_template_for_query_type
+# Motor RE2 (opcional): busca em tempo linear, sem retrocesso
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+from .query_templates import QueryTemplates, QueryType, build_query_for_type
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Confiança atribuída quando um padrão reconhece a pergunta / na busca geral
+MATCH_CONFIDENCE = 0.8
+FALLBACK_CONFIDENCE = 0.3
+
+# Perguntas/consultas memorizadas por instância do processador
+QUERY_CACHE_SIZE = 1024
+
+# Tamanho máximo da pergunta (após strip) que passa pelas regex. Uma pergunta
+# longa que não casa faz o motor retroceder a partir de cada posição (tempo
+# quadrático no tamanho da pergunta); acima disso vai direto para a busca geral.
+MAX_QUESTION_CHARS = 256
+
+# Mapeia tipos em português/inglês para tipos do KG
+_TYPE_MAPPING = {
+    'algoritmos': 'algorithm',
+    'algoritmo': 'algorithm', 
+    'algorithms': 'algorithm',
+    'algorithm': 'algorithm',
+    'conceitos': 'concept',
+    'conceito': 'concept',
+    'concepts': 'concept',
+    'concept': 'concept',
+    'métricas': 'metric',
+    'métrica': 'metric',
+    'metrics': 'metric',
+    'metric': 'metric',
+}
+
+# Artigos e preposições ignorados nos nomes de entidades
+_STOP_WORDS = frozenset({'o', 'a', 'os', 'as', 'de', 'da', 'do', 'das', 'dos', 'the', 'of', 'for'})
+
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9_]')
+
+# Nome de entidade aceito nos templates SPARQL: nome local válido após
+# "entity:" (letras, dígitos, _ e -, como nos URIs criados pelo kg_builder)
+_VALID_ENTITY = re.compile(r'\A\w[\w-]{0,63}\Z')
+
+# Tabela de str.translate que remove os caracteres Latin-1 fora de [a-z0-9_]
+_ENTITY_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789_')
+_STRIP_NON_ALNUM = str.maketrans('', '', ''.join(
+    chr(code) for code in range(256) if chr(code) not in _ENTITY_CHARS
+))
+
+# Palavras-chave obrigatórias de cada grupo de padrões, na ordem de
+# prioridade de _INTENT_CHECKS: todo padrão do grupo contém ao menos um
+# destes trechos literais, então sem nenhum deles o grupo não pode casar
+_INTENT_KEYWORDS = (
+    # what_is
+    ("é", "what is", "define", "definição de", "conceito de", "significa o que", "explique", "explain"),
+    # what_uses
+    ("usa", "uses", "that use", "implement"),
+    # type_of
+    ("é um tipo de que", "is a type of what", "é uma subclasse de", "que tipo de", "what type of",
+     "extends", "estende", "herda de"),
+    # who_created
+    ("quem criou", "who created", "quem desenvolveu", "who developed", "autor de", "author of",
+     "creator of", "foi criado por", "was created by", "foi desenvolvido por"),
+    # how_related
+    ("está relacionado com", "is related to", "se relaciona com", "relação entre", "relationship between"),
+    # list_by_type
+    ("algoritmo", "algorithm", "conceito", "concept", "métrica", "metric"),
+    # find_similar
+    ("similar", "parecido", "semelhante"),
+)
+
+# Grupo de captura sem nome: "(" que não é escape nem início de "(?"
+_CAPTURE_GROUP_RE = re.compile(r"(?<!\\)\((?!\?)")
+
+
+def _name_capture_groups(pattern: str, prefix: str) -> str:
+    """Renomeia os grupos de captura do padrão para `{prefix}_e1`, `{prefix}_e2`, ..."""
+    counter = itertools.count(1)
+    return _CAPTURE_GROUP_RE.sub(lambda _: f"(?P<{prefix}_e{next(counter)}>", pattern)
+
+
+def _normalize_question(question: str) -> str:
+    """Remove espaços das pontas e passa para minúsculas (sem cópia se já estiver)"""
+    question = question.strip()
+    if not question.islower():
+        question = question.lower()
+    return question
+
+
+def _normalize_entity_name(entity: str) -> str:
+    """
+    Normaliza o nome da entidade para o formato usado no KG
+
+    Args:
+        entity: Nome da entidade raw
+
+    Returns:
+        Nome normalizado (lowercase, underscores, etc.)
+    """
+    # Remove artigos e preposições comuns
+    words = entity.lower().split()
+    filtered_words = [word for word in words if word not in _STOP_WORDS]
+
+    # Junta com underscores e remove caracteres especiais
+    normalized = '_'.join(filtered_words)
+    normalized = normalized.translate(_STRIP_NON_ALNUM)
+    if not normalized.isascii():
+        # Caracteres fora do Latin-1 não estão na tabela
+        normalized = _NON_ALNUM_RE.sub('', normalized)
+
+    return normalized
+
+
+def _extract_single_entity(match: re.Match, groups: Tuple[str, ...]) -> List[str]:
+    """Extrai uma única entidade do match regex (primeiro grupo de `groups`)"""
+    entity = match.group(groups[0]).strip()
+    return [_normalize_entity_name(entity)]
+
+
+def _extract_two_entities(match: re.Match, groups: Tuple[str, ...]) -> List[str]:
+    """Extrai duas entidades do match regex (dois primeiros grupos de `groups`)"""
+    entity1, entity2 = match.group(groups[0], groups[1])
+    entity1 = entity1.strip()
+    entity2 = entity2.strip()
+    return [
+        _normalize_entity_name(entity1),
+        _normalize_entity_name(entity2)
+    ]
+
+
+def _extract_type_entity(match: re.Match, groups: Tuple[str, ...]) -> List[str]:
+    """Extrai tipo de entidade do match regex (primeiro grupo de `groups`)"""
+    entity_type = match.group(groups[0]).strip()
+    # A pergunta já está em minúsculas: lookup direto no mapeamento
+    return [_TYPE_MAPPING.get(entity_type, entity_type)]
+
+
+# Padrões de reconhecimento, compilados uma vez no import e compartilhados
+# entre instâncias. São compilados sem IGNORECASE: a pergunta já chega em
+# minúsculas em process_question.
+#
+# O custo do retrocesso é limitado pelo tamanho da pergunta
+# (MAX_QUESTION_CHARS, ver _classify_question), não pelas capturas: limitar a captura cortaria
+# nomes longos no meio. Nomes acima de 64 caracteres são recusados em
+# generate_sparql_query (_VALID_ENTITY).
+
+# Padrões para "O que é X?"
+_WHAT_IS_PATTERNS = [re.compile(pattern) for pattern in (
+    r"(?:o que é|what is|define|definição de|conceito de)\s+([a-zA-Z_\s]+)",
+    r"([a-zA-Z_\s]+)\s+(?:é o que|é|significa o que)",
+    r"(?:explique|explain)\s+([a-zA-Z_\s]+)",
+)]
+
+# Padrões para "O que usa X?" / "Quais algoritmos usam X?"
+_WHAT_USES_PATTERNS = [re.compile(pattern) for pattern in (
+    r"(?:o que usa|what uses|quais?.*usam?|algoritmos? que usam?)\s+([a-zA-Z_\s]+)",
+    r"(?:quais?|what).*(?:implementam?|implement)\s+([a-zA-Z_\s]+)",
+    r"(?:find|encontre).*(?:que usa|that uses?)\s+([a-zA-Z_\s]+)",
+)]
+
+# Padrões para "X é um tipo de que?"
+_TYPE_OF_PATTERNS = [re.compile(pattern) for pattern in (
+    r"([a-zA-Z_\s]+)\s+(?:é um tipo de que|is a type of what|é uma subclasse de)",
+    r"(?:que tipo de|what type of).*(?:é|is)\s+([a-zA-Z_\s]+)",
+    r"([a-zA-Z_\s]+)\s+(?:extends|estende|herda de)",
+)]
+
+# Padrões para "Quem criou X?"
+_WHO_CREATED_PATTERNS = [re.compile(pattern) for pattern in (
+    r"(?:quem criou|who created|quem desenvolveu|who developed)\s+([a-zA-Z_\s]+)",
+    r"(?:autor de|author of|creator of)\s+([a-zA-Z_\s]+)",
+    r"([a-zA-Z_\s]+)\s+(?:foi criado por|was created by|foi desenvolvido por)",
+)]
+
+# Padrões para "Como X está relacionado com Y?"
+_HOW_RELATED_PATTERNS = [re.compile(pattern) for pattern in (
+    r"(?:como|how)\s+([a-zA-Z_\s]+)\s+(?:está relacionado com|is related to|se relaciona com)\s+([a-zA-Z_\s]+)",
+    r"(?:relação entre|relationship between)\s+([a-zA-Z_\s]+)\s+(?:e|and)\s+([a-zA-Z_\s]+)",
+)]
+
+# Padrões para "Liste todos os X" / "Quais são os algoritmos?"
+_LIST_BY_TYPE_PATTERNS = [re.compile(pattern) for pattern in (
+    r"(?:liste|list|quais são|what are).*?(algoritmos?|algorithms?|conceitos?|concepts?|métricas?|metrics?)",
+    r"(?:todos os|all|all the)\s+(algoritmos?|algorithms?|conceitos?|concepts?|métricas?|metrics?)",
+    r"(?:show|mostre).*?(algoritmos?|algorithms?|conceitos?|concepts?|métricas?|metrics?)",
+)]
+
+# Padrões para "Encontre similares a X"
+_FIND_SIMILAR_PATTERNS = [re.compile(pattern) for pattern in (
+    r"(?:encontre|find|busque).*(?:similar|parecido|semelhante).*(?:a|to|with)\s+([a-zA-Z_\s]+)",
+    r"(?:conceitos?|algorithms?).*(?:similar|parecido|semelhante).*(?:a|to)\s+([a-zA-Z_\s]+)",
+)]
+
+# Ordem de prioridade dos tipos de pergunta
+_INTENT_CHECKS = [
+    (_WHAT_IS_PATTERNS, QueryType.WHAT_IS, _extract_single_entity),
+    (_WHAT_USES_PATTERNS, QueryType.WHAT_USES, _extract_single_entity),
+    (_TYPE_OF_PATTERNS, QueryType.WHAT_IS_TYPE_OF, _extract_single_entity),
+    (_WHO_CREATED_PATTERNS, QueryType.WHO_CREATED, _extract_single_entity),
+    (_HOW_RELATED_PATTERNS, QueryType.HOW_RELATED, _extract_two_entities),
+    (_LIST_BY_TYPE_PATTERNS, QueryType.LIST_BY_TYPE, _extract_type_entity),
+    (_FIND_SIMILAR_PATTERNS, QueryType.FIND_SIMILAR, _extract_single_entity),
+]
+
+# Regex mestre: cada padrão vira um lookahead nomeado ancorado no início.
+# As alternativas são tentadas na ordem acima e cada lookahead procura
+# o padrão em qualquer posição, então o resultado é o mesmo de testar
+# os padrões um a um com search() - mas em uma única chamada ao motor.
+# Como num re.Scanner, o grupo que casou (lastgroup) aponta direto para
+# a ação: tipo de consulta, extrator e nomes dos grupos das entidades.
+# A regex mestre é montada só com os grupos cujas palavras-chave
+# aparecem na pergunta (_master_for), o que mantém a prioridade:
+# os grupos descartados não poderiam casar.
+def _build_intent_tables():
+    """
+    Monta, a partir de _INTENT_CHECKS, as alternativas da regex mestre por
+    grupo, o despacho nome do padrão -> (tipo, extrator, grupos das
+    entidades) e, com RE2, os padrões compilados por grupo
+    """
+    alternatives = []
+    dispatch = {}
+    # Com RE2 (que não suporta lookahead) os padrões são testados um a um,
+    # na mesma ordem de prioridade, cada busca em tempo linear
+    re2_patterns = [] if RE2_AVAILABLE else None
+    for i, (patterns, query_type, entity_extractor) in enumerate(_INTENT_CHECKS):
+        bucket_alternatives = []
+        bucket_re2 = []
+        for j, pattern in enumerate(patterns):
+            name = f"p{i}_{j}"
+            named_pattern = _name_capture_groups(pattern.pattern, name)
+            bucket_alternatives.append(f"(?=[\\s\\S]*?(?P<{name}>{named_pattern}))")
+            if RE2_AVAILABLE:
+                bucket_re2.append((name, re2.compile(named_pattern)))
+            groups = tuple(f"{name}_e{k}" for k in range(1, pattern.groups + 1))
+            dispatch[name] = (query_type, entity_extractor, groups)
+        alternatives.append(bucket_alternatives)
+        if RE2_AVAILABLE:
+            re2_patterns.append(bucket_re2)
+    return alternatives, dispatch, re2_patterns
+
+
+_ALTERNATIVES, _DISPATCH, _RE2_PATTERNS = _build_intent_tables()
+
+
+@functools.lru_cache(maxsize=None)
+def _master_for(buckets: Tuple[int, ...]) -> re.Pattern:
+    """Regex mestre (compilada sob demanda) com os padrões dos grupos indicados"""
+    alternatives = [alt for i in buckets for alt in _ALTERNATIVES[i]]
+    return re.compile(r"\A(?:" + "|".join(alternatives) + ")")
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class QueryIntent:
     """
     Representa a intenção extraída de uma pergunta do usuário
@@ -49,62 +300,21 @@ class QueryProcessor:
     e extrai entidades mencionadas para gerar a consulta apropriada.
     """
     
-    def __init__(self):
-        """Inicializa o processador com padrões de reconhecimento"""
-        self._setup_patterns()
+    # Padrões compilados no import (ver constantes do módulo)
+    what_is_patterns = _WHAT_IS_PATTERNS
+    what_uses_patterns = _WHAT_USES_PATTERNS
+    type_of_patterns = _TYPE_OF_PATTERNS
+    who_created_patterns = _WHO_CREATED_PATTERNS
+    how_related_patterns = _HOW_RELATED_PATTERNS
+    list_by_type_patterns = _LIST_BY_TYPE_PATTERNS
+    find_similar_patterns = _FIND_SIMILAR_PATTERNS
     
-    def _setup_patterns(self) -> None:
-        """
-        Define padrões regex para diferentes tipos de perguntas
-        Cada padrão mapeia para um QueryType específico
-        """
-        
-        # Padrões para "O que é X?"
-        self.what_is_patterns = [
-            r"(?:o que é|what is|define|definição de|conceito de)\s+([a-zA-Z_\s]+)",
-            r"([a-zA-Z_\s]+)\s+(?:é o que|é|significa o que)",
-            r"(?:explique|explain)\s+([a-zA-Z_\s]+)",
-        ]
-        
-        # Padrões para "O que usa X?" / "Quais algoritmos usam X?"
-        self.what_uses_patterns = [
-            r"(?:o que usa|what uses|quais?.*usam?|algoritmos? que usam?)\s+([a-zA-Z_\s]+)",
-            r"(?:quais?|what).*(?:implementam?|implement)\s+([a-zA-Z_\s]+)",
-            r"(?:find|encontre).*(?:que usa|that uses?)\s+([a-zA-Z_\s]+)",
-        ]
-        
-        # Padrões para "X é um tipo de que?"
-        self.type_of_patterns = [
-            r"([a-zA-Z_\s]+)\s+(?:é um tipo de que|is a type of what|é uma subclasse de)",
-            r"(?:que tipo de|what type of).*(?:é|is)\s+([a-zA-Z_\s]+)",
-            r"([a-zA-Z_\s]+)\s+(?:extends|estende|herda de)",
-        ]
-        
-        # Padrões para "Quem criou X?"
-        self.who_created_patterns = [
-            r"(?:quem criou|who created|quem desenvolveu|who developed)\s+([a-zA-Z_\s]+)",
-            r"(?:autor de|author of|creator of)\s+([a-zA-Z_\s]+)",
-            r"([a-zA-Z_\s]+)\s+(?:foi criado por|was created by|foi desenvolvido por)",
-        ]
-        
-        # Padrões para "Como X está relacionado com Y?"
-        self.how_related_patterns = [
-            r"(?:como|how)\s+([a-zA-Z_\s]+)\s+(?:está relacionado com|is related to|se relaciona com)\s+([a-zA-Z_\s]+)",
-            r"(?:relação entre|relationship between)\s+([a-zA-Z_\s]+)\s+(?:e|and)\s+([a-zA-Z_\s]+)",
-        ]
-        
-        # Padrões para "Liste todos os X" / "Quais são os algoritmos?"
-        self.list_by_type_patterns = [
-            r"(?:liste|list|quais são|what are).*?(algoritmos?|algorithms?|conceitos?|concepts?|métricas?|metrics?)",
-            r"(?:todos os|all|all the)\s+(algoritmos?|algorithms?|conceitos?|concepts?|métricas?|metrics?)",
-            r"(?:show|mostre).*?(algoritmos?|algorithms?|conceitos?|concepts?|métricas?|metrics?)",
-        ]
-        
-        # Padrões para "Encontre similares a X"
-        self.find_similar_patterns = [
-            r"(?:encontre|find|busque).*(?:similar|parecido|semelhante).*(?:a|to|with)\s+([a-zA-Z_\s]+)",
-            r"(?:conceitos?|algorithms?).*(?:similar|parecido|semelhante).*(?:a|to)\s+([a-zA-Z_\s]+)",
-        ]
+    def __init__(self):
+        """Inicializa o processador (os padrões já estão compilados no módulo)"""
+        # Perguntas repetidas (mesmo texto normalizado) reaproveitam a classificação
+        # e a consulta gerada
+        self._classify_cached = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._classify_question)
+        self._build_sparql_cached = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._build_sparql)
     
     def process_question(self, question: str) -> QueryIntent:
         """
@@ -116,100 +326,107 @@ class QueryProcessor:
         Returns:
             QueryIntent com tipo de consulta e entidades identificadas
         """
-        question = question.lower().strip()
-        logger.info(f"🔍 Processando pergunta: '{question}'")
+        question = _normalize_question(question)
+        logger.info("🔍 Processando pergunta: '%s'", question)
         
-        # Tenta cada padrão em ordem de prioridade
-        intent_checks = [
-            (self.what_is_patterns, QueryType.WHAT_IS, self._extract_single_entity),
-            (self.what_uses_patterns, QueryType.WHAT_USES, self._extract_single_entity),
-            (self.type_of_patterns, QueryType.WHAT_IS_TYPE_OF, self._extract_single_entity),
-            (self.who_created_patterns, QueryType.WHO_CREATED, self._extract_single_entity),
-            (self.how_related_patterns, QueryType.HOW_RELATED, self._extract_two_entities),
-            (self.list_by_type_patterns, QueryType.LIST_BY_TYPE, self._extract_type_entity),
-            (self.find_similar_patterns, QueryType.FIND_SIMILAR, self._extract_single_entity),
-        ]
+        query_type, entities, confidence = self._classify_cached(question)
         
-        for patterns, query_type, entity_extractor in intent_checks:
-            for pattern in patterns:
-                match = re.search(pattern, question, re.IGNORECASE)
-                if match:
-                    entities = entity_extractor(match)
-                    if entities:
-                        logger.info(f"✅ Identificado: {query_type.value}, entidades: {entities}")
-                        return QueryIntent(
-                            query_type=query_type,
-                            entities=entities,
-                            confidence=0.8,  # Confidence básica
-                            raw_question=question
-                        )
+        if confidence == FALLBACK_CONFIDENCE:
+            logger.warning("⚠️ Padrão não identificado, usando busca geral")
+        else:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("✅ Identificado: %s, entidades: %s", query_type.value, list(entities))
         
-        # Se nenhum padrão foi encontrado, assumir busca geral
-        logger.warning(f"⚠️ Padrão não identificado, usando busca geral")
         return QueryIntent(
-            query_type=QueryType.WHAT_IS,
-            entities=[question.split()[-1]],  # Última palavra como entidade
-            confidence=0.3,
+            query_type=query_type,
+            entities=list(entities),
+            confidence=confidence,
             raw_question=question
         )
     
-    def _extract_single_entity(self, match: re.Match) -> List[str]:
-        """Extrai uma única entidade do match regex"""
-        entity = match.group(1).strip()
-        return [self._normalize_entity_name(entity)]
-    
-    def _extract_two_entities(self, match: re.Match) -> List[str]:
-        """Extrai duas entidades do match regex"""
-        entity1 = match.group(1).strip()
-        entity2 = match.group(2).strip()
-        return [
-            self._normalize_entity_name(entity1),
-            self._normalize_entity_name(entity2)
-        ]
-    
-    def _extract_type_entity(self, match: re.Match) -> List[str]:
-        """Extrai tipo de entidade do match regex"""
-        entity_type = match.group(1).strip()
-        # Mapeia tipos em português/inglês para tipos do KG
-        type_mapping = {
-            'algoritmos': 'algorithm',
-            'algoritmo': 'algorithm', 
-            'algorithms': 'algorithm',
-            'algorithm': 'algorithm',
-            'conceitos': 'concept',
-            'conceito': 'concept',
-            'concepts': 'concept',
-            'concept': 'concept',
-            'métricas': 'metric',
-            'métrica': 'metric',
-            'metrics': 'metric',
-            'metric': 'metric',
-        }
-        
-        normalized_type = type_mapping.get(entity_type.lower(), entity_type)
-        return [normalized_type]
-    
-    def _normalize_entity_name(self, entity: str) -> str:
+    def process_questions(self, questions: List[str]) -> List[QueryIntent]:
         """
-        Normaliza o nome da entidade para o formato usado no KG
+        Processa um lote de perguntas (ex.: mineração de logs do chatbot)
+        
+        Cada pergunta recebe a mesma intenção que process_question daria,
+        mas sem log por pergunta: apenas um resumo do lote. Uma pergunta que
+        não pode ser processada (ex.: vazia) não interrompe o lote: recebe uma
+        intenção de busca geral sem entidades e confiança 0.
         
         Args:
-            entity: Nome da entidade raw
+            questions: Perguntas do usuário
             
         Returns:
-            Nome normalizado (lowercase, underscores, etc.)
+            Lista de QueryIntent, na mesma ordem das perguntas
+        """
+        classify = self._classify_cached
+        intents = []
+        fallbacks = 0
+        failures = 0
+        
+        for question in questions:
+            try:
+                question = _normalize_question(question)
+                query_type, entities, confidence = classify(question)
+            except Exception as e:
+                logger.warning("⚠️ Pergunta não processada (%r): %s", question, e)
+                failures += 1
+                query_type, entities, confidence = QueryType.WHAT_IS, (), 0.0
+            
+            if confidence == FALLBACK_CONFIDENCE:
+                fallbacks += 1
+            intents.append(QueryIntent(
+                query_type=query_type,
+                entities=list(entities),
+                confidence=confidence,
+                raw_question=question
+            ))
+        
+        logger.info("✅ %d perguntas processadas (%d em busca geral, %d com erro)",
+                    len(intents), fallbacks, failures)
+        return intents
+    
+    def _classify_question(self, question: str) -> Tuple[QueryType, Tuple[str, ...], float]:
         """
-        # Remove artigos e preposições comuns
-        stop_words = ['o', 'a', 'os', 'as', 'de', 'da', 'do', 'das', 'dos', 'the', 'of', 'for']
+        Identifica tipo de consulta e entidades de uma pergunta já normalizada
         
-        words = entity.lower().split()
-        filtered_words = [word for word in words if word not in stop_words]
+        Returns:
+            Tupla (tipo de consulta, entidades, confiança) - imutável para o cache
+        """
+        # Só os grupos com alguma palavra-chave na pergunta podem casar; sem
+        # nenhum, ou se a pergunta for longa demais para as regex, vai direto
+        # para a busca geral sem rodar regex alguma
+        if len(question) > MAX_QUESTION_CHARS:
+            buckets = ()
+        else:
+            buckets = tuple(
+                i for i, keywords in enumerate(_INTENT_KEYWORDS)
+                if any(keyword in question for keyword in keywords)
+            )
+        match, name = self._match_intent(question, buckets) if buckets else (None, None)
+        if match:
+            query_type, entity_extractor, groups = _DISPATCH[name]
+            return query_type, tuple(entity_extractor(match, groups)), MATCH_CONFIDENCE
         
-        # Junta com underscores e remove caracteres especiais
-        normalized = '_'.join(filtered_words)
-        normalized = re.sub(r'[^a-z0-9_]', '', normalized)
+        # Se nenhum padrão foi encontrado, assumir busca geral
+        # (última palavra como entidade)
+        return QueryType.WHAT_IS, (question.split()[-1],), FALLBACK_CONFIDENCE
+    
+    def _match_intent(self, question: str, buckets: Tuple[int, ...]) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Retorna (match, nome do padrão) do primeiro padrão que casa, entre os
+        grupos de padrões indicados, ou (None, None)
+        """
+        if _RE2_PATTERNS is not None:
+            for i in buckets:
+                for name, pattern in _RE2_PATTERNS[i]:
+                    match = pattern.search(question)
+                    if match:
+                        return match, name
+            return None, None
         
-        return normalized
+        match = _master_for(buckets).search(question)
+        return (match, match.lastgroup) if match else (None, None)
     
     def generate_sparql_query(self, intent: QueryIntent) -> str:
         """
@@ -221,34 +438,25 @@ class QueryProcessor:
         Returns:
             Consulta SPARQL completa
         """
-        template_func = get_template_for_query_type(intent.query_type)
-        
-        if not template_func:
-            raise ValueError(f"Template não encontrado para {intent.query_type}")
-        
         try:
-            if intent.query_type == QueryType.HOW_RELATED:
-                # Consultas de relação precisam de duas entidades
-                if len(intent.entities) >= 2:
-                    query = template_func(intent.entities[0], intent.entities[1])
-                else:
-                    raise ValueError("Consulta de relação precisa de duas entidades")
-            
-            elif intent.query_type == QueryType.LIST_BY_TYPE:
-                # Consultas de listagem usam o tipo de entidade
-                query = template_func(intent.entities[0], limit=15)
-            
-            else:
-                # Consultas padrão usam uma entidade
-                query = template_func(intent.entities[0])
+            # Rejeita entidades malformadas antes de montar a consulta, em vez de
+            # deixar o parser SPARQL falhar depois
+            invalid = [entity for entity in intent.entities if not _VALID_ENTITY.match(entity)]
+            if invalid:
+                raise ValueError(f"Entidade inválida para consulta SPARQL: {invalid[0]!r}")
             
-            logger.info(f"✅ SPARQL gerado para {intent.query_type.value}")
+            query = self._build_sparql_cached(intent.query_type, tuple(intent.entities))
+            logger.info("✅ SPARQL gerado para %s", intent.query_type.value)
             return query
             
         except Exception as e:
-            logger.error(f"❌ Erro ao gerar SPARQL: {e}")
+            logger.error("❌ Erro ao gerar SPARQL: %s", e)
             raise
     
+    def _build_sparql(self, query_type: QueryType, entities: Tuple[str, ...]) -> str:
+        """Preenche o template do tipo de consulta com as entidades"""
+        return build_query_for_type(query_type, entities)
+    
     def process_and_generate(self, question: str) -> Tuple[QueryIntent, str]:
         """
         Método conveniente que processa pergunta e gera SPARQL de uma vez
@@ -277,6 +485,8 @@ def create_query_processor() -> QueryProcessor:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Teste do processador
     print("🧪 Testando Query Processor...")
     
@@ -6,9 +6,14 @@ de consultas comuns no Knowledge Graph ML/DL.
 
 Cada template é uma string com placeholders que serão substituídos
 pelo QueryProcessor baseado na pergunta do usuário.
+
+As consultas geradas não têm cache aqui: o QueryProcessor memoriza
+(tipo de consulta, entidades) -> SPARQL em um único LRU
+(_build_sparql_cached, QUERY_CACHE_SIZE entradas).
 """
 
-from typing import Dict, List
+import string
+from typing import Dict, List, Tuple
 from enum import Enum
 
 
@@ -23,6 +28,37 @@ class QueryType(Enum):
     FIND_SIMILAR = "find_similar"         # "Encontre conceitos similares a X"
 
 
+# Prefixos comuns para todas as consultas
+_PREFIXES_BLOCK = """
+        PREFIX ml: <http://ml-kg.org/ontology/>
+        PREFIX entity: <http://ml-kg.org/entity/>
+        PREFIX relation: <http://ml-kg.org/relation/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    """
+_PREFIXES = _PREFIXES_BLOCK.strip()
+
+
+_FORMATTER = string.Formatter()
+
+
+def _template(body: str) -> Tuple[str, ...]:
+    """
+    Insere os prefixos no corpo do template e o divide nos trechos literais
+    entre os placeholders, para ser preenchido com str.join
+    """
+    parts = []
+    current = []
+    for literal, field, _, _ in _FORMATTER.parse(body.replace("{prefixes}", _PREFIXES)):
+        # Chaves escapadas ({{ }}) também quebram o texto: junta até o próximo campo
+        current.append(literal)
+        if field is not None:
+            parts.append("".join(current))
+            current = []
+    parts.append("".join(current))
+    return tuple(parts)
+
+
 class QueryTemplates:
     """
     Coleção de templates SPARQL para diferentes tipos de consultas
@@ -32,18 +68,12 @@ class QueryTemplates:
     """
     
     # Prefixos comuns para todas as consultas
-    PREFIXES = """
-        PREFIX ml: <http://ml-kg.org/ontology/>
-        PREFIX entity: <http://ml-kg.org/entity/>
-        PREFIX relation: <http://ml-kg.org/relation/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    """
+    PREFIXES = _PREFIXES_BLOCK
     
     @staticmethod
     def get_prefixes() -> str:
         """Retorna os prefixos padrão para todas as consultas"""
-        return QueryTemplates.PREFIXES.strip()
+        return _PREFIXES
     
     @staticmethod
     def what_is_entity(entity_name: str) -> str:
@@ -57,15 +87,8 @@ class QueryTemplates:
         Returns:
             Consulta SPARQL completa
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
-        
-        SELECT ?type ?label ?property ?value WHERE {{
-            entity:{entity_name} rdf:type ?type .
-            OPTIONAL {{ entity:{entity_name} rdfs:label ?label . }}
-            OPTIONAL {{ entity:{entity_name} ?property ?value . }}
-        }}
-        """
+        p = _TMPL_WHAT_IS_ENTITY
+        return ''.join((p[0], entity_name, p[1], entity_name, p[2], entity_name, p[3]))
     
     @staticmethod
     def what_uses_entity(entity_name: str) -> str:
@@ -79,18 +102,8 @@ class QueryTemplates:
         Returns:
             Consulta SPARQL para encontrar usuários da entidade
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
-        
-        SELECT ?user ?userLabel ?userType ?relation WHERE {{
-            ?user ?relation entity:{entity_name} .
-            ?user rdf:type ?userType .
-            ?user rdfs:label ?userLabel .
-            
-            FILTER(?relation IN (relation:uses, relation:implements, relation:applies_to))
-        }}
-        ORDER BY ?userType ?userLabel
-        """
+        p = _TMPL_WHAT_USES_ENTITY
+        return ''.join((p[0], entity_name, p[1]))
     
     @staticmethod
     def what_is_type_of(entity_name: str) -> str:
@@ -104,14 +117,8 @@ class QueryTemplates:
         Returns:
             Consulta para encontrar tipos parent
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
-        
-        SELECT ?parent ?parentLabel WHERE {{
-            entity:{entity_name} relation:is_a ?parent .
-            OPTIONAL {{ ?parent rdfs:label ?parentLabel . }}
-        }}
-        """
+        p = _TMPL_WHAT_IS_TYPE_OF
+        return ''.join((p[0], entity_name, p[1]))
     
     @staticmethod
     def who_created_entity(entity_name: str) -> str:
@@ -125,21 +132,8 @@ class QueryTemplates:
         Returns:
             Consulta para encontrar criadores
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
-        
-        SELECT ?creator ?creatorLabel WHERE {{
-            {{ 
-                entity:{entity_name} relation:developed_by ?creator .
-                OPTIONAL {{ ?creator rdfs:label ?creatorLabel . }}
-            }}
-            UNION
-            {{
-                entity:{entity_name} relation:proposed_by ?creator .
-                OPTIONAL {{ ?creator rdfs:label ?creatorLabel . }}
-            }}
-        }}
-        """
+        p = _TMPL_WHO_CREATED_ENTITY
+        return ''.join((p[0], entity_name, p[1], entity_name, p[2]))
     
     @staticmethod
     def how_entities_related(entity1: str, entity2: str) -> str:
@@ -154,15 +148,8 @@ class QueryTemplates:
         Returns:
             Consulta para encontrar relações entre entidades
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
-        
-        SELECT ?relation WHERE {{
-            {{ entity:{entity1} ?relation entity:{entity2} . }}
-            UNION
-            {{ entity:{entity2} ?relation entity:{entity1} . }}
-        }}
-        """
+        p = _TMPL_HOW_ENTITIES_RELATED
+        return ''.join((p[0], entity1, p[1], entity2, p[2], entity2, p[3], entity1, p[4]))
     
     @staticmethod
     def list_entities_by_type(entity_type: str, limit: int = 20) -> str:
@@ -177,16 +164,8 @@ class QueryTemplates:
         Returns:
             Consulta para listar entidades por tipo
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
-        
-        SELECT ?entity ?label WHERE {{
-            ?entity rdf:type ml:{entity_type} .
-            ?entity rdfs:label ?label .
-        }}
-        ORDER BY ?label
-        LIMIT {limit}
-        """
+        p = _TMPL_LIST_ENTITIES_BY_TYPE
+        return ''.join((p[0], entity_type, p[1], str(limit), p[2]))
     
     @staticmethod
     def find_similar_entities(entity_name: str, limit: int = 10) -> str:
@@ -201,19 +180,8 @@ class QueryTemplates:
         Returns:
             Consulta para encontrar entidades similares
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
-        
-        SELECT ?similar ?similarLabel ?commonType WHERE {{
-            entity:{entity_name} rdf:type ?commonType .
-            ?similar rdf:type ?commonType .
-            ?similar rdfs:label ?similarLabel .
-            
-            FILTER(?similar != entity:{entity_name})
-        }}
-        ORDER BY ?similarLabel
-        LIMIT {limit}
-        """
+        p = _TMPL_FIND_SIMILAR_ENTITIES
+        return ''.join((p[0], entity_name, p[1], entity_name, p[2], str(limit), p[3]))
     
     @staticmethod
     def get_entity_relations(entity_name: str) -> str:
@@ -227,8 +195,99 @@ class QueryTemplates:
         Returns:
             Consulta para todas as relações da entidade
         """
-        return f"""
-        {QueryTemplates.get_prefixes()}
+        p = _TMPL_GET_ENTITY_RELATIONS
+        return ''.join((p[0], entity_name, p[1], entity_name, p[2]))
+
+
+# Templates pré-montados (prefixos já inseridos), divididos nos trechos entre
+# os placeholders; os métodos acima os preenchem em ordem com str.join
+# (mais rápido que str.replace de um marcador, que percorre o template
+# inteiro a cada entidade e exigiria marcadores distintos por entidade)
+_TMPL_WHAT_IS_ENTITY = _template("""
+        {prefixes}
+        
+        SELECT ?type ?label ?property ?value WHERE {{
+            entity:{entity_name} rdf:type ?type .
+            OPTIONAL {{ entity:{entity_name} rdfs:label ?label . }}
+            OPTIONAL {{ entity:{entity_name} ?property ?value . }}
+        }}
+        """)
+
+_TMPL_WHAT_USES_ENTITY = _template("""
+        {prefixes}
+        
+        SELECT ?user ?userLabel ?userType ?relation WHERE {{
+            ?user ?relation entity:{entity_name} .
+            ?user rdf:type ?userType .
+            ?user rdfs:label ?userLabel .
+            
+            FILTER(?relation IN (relation:uses, relation:implements, relation:applies_to))
+        }}
+        ORDER BY ?userType ?userLabel
+        """)
+
+_TMPL_WHAT_IS_TYPE_OF = _template("""
+        {prefixes}
+        
+        SELECT ?parent ?parentLabel WHERE {{
+            entity:{entity_name} relation:is_a ?parent .
+            OPTIONAL {{ ?parent rdfs:label ?parentLabel . }}
+        }}
+        """)
+
+_TMPL_WHO_CREATED_ENTITY = _template("""
+        {prefixes}
+        
+        SELECT ?creator ?creatorLabel WHERE {{
+            {{ 
+                entity:{entity_name} relation:developed_by ?creator .
+                OPTIONAL {{ ?creator rdfs:label ?creatorLabel . }}
+            }}
+            UNION
+            {{
+                entity:{entity_name} relation:proposed_by ?creator .
+                OPTIONAL {{ ?creator rdfs:label ?creatorLabel . }}
+            }}
+        }}
+        """)
+
+_TMPL_HOW_ENTITIES_RELATED = _template("""
+        {prefixes}
+        
+        SELECT ?relation WHERE {{
+            {{ entity:{entity1} ?relation entity:{entity2} . }}
+            UNION
+            {{ entity:{entity2} ?relation entity:{entity1} . }}
+        }}
+        """)
+
+_TMPL_LIST_ENTITIES_BY_TYPE = _template("""
+        {prefixes}
+        
+        SELECT ?entity ?label WHERE {{
+            ?entity rdf:type ml:{entity_type} .
+            ?entity rdfs:label ?label .
+        }}
+        ORDER BY ?label
+        LIMIT {limit}
+        """)
+
+_TMPL_FIND_SIMILAR_ENTITIES = _template("""
+        {prefixes}
+        
+        SELECT ?similar ?similarLabel ?commonType WHERE {{
+            entity:{entity_name} rdf:type ?commonType .
+            ?similar rdf:type ?commonType .
+            ?similar rdfs:label ?similarLabel .
+            
+            FILTER(?similar != entity:{entity_name})
+        }}
+        ORDER BY ?similarLabel
+        LIMIT {limit}
+        """)
+
+_TMPL_GET_ENTITY_RELATIONS = _template("""
+        {prefixes}
         
         SELECT ?relation ?target ?targetLabel WHERE {{
             {{ entity:{entity_name} ?relation ?target . }}
@@ -241,7 +300,7 @@ class QueryTemplates:
             FILTER(STRSTARTS(STR(?relation), STR(relation:)))
         }}
         ORDER BY ?relation
-        """
+        """)
 
 
 # Mapeamento de tipos de pergunta para templates
@@ -256,6 +315,25 @@ QUERY_TYPE_MAPPING = {
 }
 
 
+def _how_related(entities):
+    # Consultas de relação precisam de duas entidades
+    if len(entities) < 2:
+        raise ValueError("Consulta de relação precisa de duas entidades")
+    return QueryTemplates.how_entities_related(entities[0], entities[1])
+
+
+# Tipo de pergunta -> função que já conhece a aridade do template
+_DISPATCH = {
+    QueryType.WHAT_IS: lambda es: QueryTemplates.what_is_entity(es[0]),
+    QueryType.WHAT_USES: lambda es: QueryTemplates.what_uses_entity(es[0]),
+    QueryType.WHAT_IS_TYPE_OF: lambda es: QueryTemplates.what_is_type_of(es[0]),
+    QueryType.WHO_CREATED: lambda es: QueryTemplates.who_created_entity(es[0]),
+    QueryType.HOW_RELATED: _how_related,
+    QueryType.LIST_BY_TYPE: lambda es: QueryTemplates.list_entities_by_type(es[0], limit=15),
+    QueryType.FIND_SIMILAR: lambda es: QueryTemplates.find_similar_entities(es[0]),
+}
+
+
 def get_template_for_query_type(query_type: QueryType) -> callable:
     """
     Retorna a função de template apropriada para um tipo de consulta
@@ -269,6 +347,23 @@ def get_template_for_query_type(query_type: QueryType) -> callable:
     return QUERY_TYPE_MAPPING.get(query_type)
 
 
+def build_query_for_type(query_type: QueryType, entities) -> str:
+    """
+    Preenche o template de um tipo de consulta com as entidades
+    
+    Args:
+        query_type: Tipo da consulta
+        entities: Entidades extraídas da pergunta
+        
+    Returns:
+        Consulta SPARQL completa
+    """
+    builder = _DISPATCH.get(query_type)
+    if builder is None:
+        raise ValueError(f"Template não encontrado para {query_type}")
+    return builder(entities)
+
+
 if __name__ == "__main__":
     # Teste dos templates
     print("🧪 Testando Query Templates...")
@@ -5,16 +5,58 @@ Este módulo usa o LLM (Ollama) para transformar respostas estruturadas
 do Knowledge Graph em texto natural fluido e conversacional.
 """
 
+import asyncio
+import contextlib
+import hashlib
 import logging
 import json
-from typing import Dict, Any, Optional
+import re
+import threading
+import time
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
-import ollama
 
-from .response_formatter import FormattedResponse
+from .query_templates import QueryType
+from .response_formatter import FormattedResponse, ResponseFormatter
 
 logger = logging.getLogger(__name__)
 
+# Modelo padrão. A tag llama3.2:3b do Ollama já aponta para a quantização
+# Q4_K_M; tags Q8_0/fp16 têm qualidade um pouco maior, mas a decodificação é
+# limitada pela banda de memória: Q8 lê o dobro de bytes por token (~2x mais lenta).
+DEFAULT_MODEL = "llama3.2:3b"
+
+# Acima desta quantização (bits por peso) o enhancer avisa na inicialização
+MAX_QUANT_BITS = 4
+
+# Respostas do LLM memorizadas por prompt (por instância do enhancer)
+LLM_CACHE_SIZE = 1024
+
+# Opções de geração do Ollama para a resposta natural
+GENERATION_OPTIONS = {
+    "num_predict": 300,  # Limite de tokens para resposta concisa
+    "temperature": 0.7,   # Criatividade moderada
+    "top_p": 0.9,        # Diversidade de vocabulário
+    "stop": ["TAREFA:", "PERGUNTA:", "DADOS:"],  # Stop tokens
+    "num_batch": 512,    # Tokens do prompt processados por lote no prefill
+}
+
+# Respostas estruturadas mais curtas que isso são usadas como estão, sem LLM
+MIN_ENHANCE_CHARS = 40
+
+# Respostas formatadas aguardando o LLM no pipeline (formatação adiantada)
+PIPELINE_QUEUE_SIZE = 2
+
+# Mantém o modelo carregado no Ollama entre chamadas (o padrão do servidor
+# descarrega após 5 minutos ociosos e a próxima pergunta paga o recarregamento)
+KEEP_ALIVE = -1
+
+# Janela de contexto: mínimo fixo, dobrada só para prompts maiores. Mudar
+# num_ctx entre chamadas faz o Ollama recarregar o modelo, então o valor
+# não acompanha cada prompt - apenas evita truncar prompts grandes.
+MIN_CONTEXT_TOKENS = 2048
+CHARS_PER_TOKEN = 3
+
 
 @dataclass
 class EnhancedResponse:
@@ -44,29 +86,88 @@ class ResponseEnhancer:
     4. Combina dados estruturados + resposta natural
     """
     
-    def __init__(self, model_name: str = "llama3.2:3b"):
+    # Instruções fixas, enviadas como mensagem de sistema: ficam sempre no
+    # início do contexto, então o Ollama reaproveita o prefixo já processado
+    # (cache KV) entre chamadas e só processa a parte variável do prompt
+    _SYSTEM_PROMPT = """Você é um assistente especializado em Machine Learning e Deep Learning. 
+Sua tarefa é converter informações estruturadas do Knowledge Graph em respostas naturais e conversacionais.
+
+REGRAS IMPORTANTES:
+1. Use linguagem clara e didática
+2. Mantenha precisão técnica
+3. Seja conciso mas informativo
+4. Use exemplos quando apropriado
+5. Responda em português brasileiro"""
+    
+    # Instruções específicas por tipo de consulta
+    _QUERY_INSTRUCTIONS = {
+        "what_is": "Explique o conceito de forma didática, incluindo definição, características principais e aplicações.",
+        "what_uses": "Liste e explique brevemente cada item que usa o conceito mencionado.",
+        "what_is_type_of": "Explique a hierarquia e classificação do conceito.",
+        "who_created": "Forneça informações sobre os criadores e contexto histórico.",
+        "how_related": "Explique as conexões e relações entre os conceitos.",
+        "list_by_type": "Apresente a lista de forma organizada com breves descrições.",
+        "find_similar": "Compare e explique as similaridades entre os conceitos."
+    }
+    _DEFAULT_INSTRUCTION = "Responda de forma clara e informativa."
+    
+    def __init__(self, model_name: str = DEFAULT_MODEL, keep_alive: Union[int, str] = KEEP_ALIVE):
         """
         Inicializa o enhancer com modelo Ollama
         
         Args:
-            model_name: Nome do modelo Ollama a usar
+            model_name: Nome do modelo Ollama a usar (prefira variantes Q4,
+                ex.: "llama3.2:3b-instruct-q4_K_M"; Q8/fp16 decodificam mais devagar)
+            keep_alive: Por quanto tempo o Ollama mantém o modelo carregado
+                após cada chamada (-1 = indefinidamente, "5m", 0 = descarrega)
         """
         self.model_name = model_name
+        self.keep_alive = keep_alive
+        
+        # Importado só aqui: o pacote ollama (httpx, pydantic) pesa no import
+        # e quem usa apenas o ResponseFormatter não precisa dele
+        import ollama
+        self._ollama = ollama
+        # Cliente reaproveitado entre chamadas (mantém as conexões HTTP abertas).
+        # O cliente assíncrono é criado a cada enhance_many/pipeline: suas
+        # conexões ficam presas ao event loop em que foram abertas.
+        self._client = ollama.Client()
+        
+        # Cache LRU de respostas: hash do prompt -> resposta natural
+        self._response_cache: Dict[bytes, str] = {}
+        self._cache_lock = threading.Lock()
+        
         self._test_llm_connection()
+        self._check_quantization()
     
     def _test_llm_connection(self) -> None:
         """Testa conexão com Ollama"""
         try:
-            response = ollama.chat(
+            response = self._client.chat(
                 model=self.model_name,
                 messages=[{"role": "user", "content": "Test"}],
-                options={"num_predict": 10}
+                options={"num_predict": 10},
+                keep_alive=self.keep_alive
             )
             logger.info(f"✅ Conexão com Ollama ({self.model_name}) estabelecida")
         except Exception as e:
             logger.warning(f"⚠️ Ollama não disponível: {e}")
             raise
     
+    def _check_quantization(self) -> None:
+        """Avisa se o modelo carregado usa quantização maior que MAX_QUANT_BITS"""
+        try:
+            level = self._client.show(self.model_name)['details']['quantization_level']
+        except Exception as e:
+            logger.debug("Quantização de %s não verificada: %s", self.model_name, e)
+            return
+        
+        # Ex.: "Q4_K_M" -> 4, "Q8_0" -> 8, "F16"/"BF16" -> 16
+        match = re.search(r'\d+', level or '')
+        if match and int(match.group()) > MAX_QUANT_BITS:
+            logger.warning("⚠️ Modelo %s usa quantização %s; uma variante Q4 gera respostas mais rápido",
+                           self.model_name, level)
+    
     def enhance_response(self, 
                         formatted_response: FormattedResponse,
                         original_question: str,
@@ -82,8 +183,16 @@ class ResponseEnhancer:
         Returns:
             Resposta melhorada em linguagem natural
         """
-        import time
-        start_time = time.time()
+        start_time = time.perf_counter()
+        
+        trivial_answer = self._trivial_answer(formatted_response, original_question)
+        if trivial_answer is not None:
+            return EnhancedResponse(
+                natural_answer=trivial_answer,
+                structured_data=formatted_response.answer,
+                confidence=formatted_response.confidence,
+                processing_time=time.perf_counter() - start_time
+            )
         
         try:
             # Cria prompt contextualizado
@@ -98,7 +207,7 @@ class ResponseEnhancer:
             # Gera resposta natural com LLM
             natural_answer = self._generate_natural_response(prompt)
             
-            processing_time = time.time() - start_time
+            processing_time = time.perf_counter() - start_time
             
             return EnhancedResponse(
                 natural_answer=natural_answer,
@@ -114,9 +223,201 @@ class ResponseEnhancer:
                 natural_answer=formatted_response.answer,
                 structured_data=formatted_response.answer,
                 confidence=formatted_response.confidence * 0.8,  # Reduz confidence
-                processing_time=time.time() - start_time
+                processing_time=time.perf_counter() - start_time
+            )
+    
+    async def enhance_many(self,
+                           items: List[Tuple[FormattedResponse, str, str]]) -> List[EnhancedResponse]:
+        """
+        Converte várias respostas estruturadas em linguagem natural, com as
+        chamadas ao LLM feitas em paralelo
+        
+        O Ollama só processa as requisições ao mesmo tempo até o limite de
+        OLLAMA_NUM_PARALLEL (variável de ambiente do servidor); acima disso
+        elas esperam na fila do servidor.
+        
+        Args:
+            items: Tuplas (resposta formatada, pergunta original, tipo de consulta)
+            
+        Returns:
+            Respostas melhoradas, na mesma ordem de `items`
+        """
+        async with self._ollama.AsyncClient() as client:
+            return list(await asyncio.gather(*[
+                self._aenhance_response(client, formatted_response, original_question, query_type)
+                for formatted_response, original_question, query_type in items
+            ]))
+    
+    async def pipeline(self,
+                       formatter: ResponseFormatter,
+                       items: Iterable[Tuple[List[Dict[str, Any]], QueryType, str, List[str]]]
+                       ) -> AsyncIterator[EnhancedResponse]:
+        """
+        Formata e melhora uma sequência de resultados em pipeline: enquanto o
+        LLM gera a resposta de um item, os próximos já são formatados (em uma
+        thread, sem bloquear o event loop)
+        
+        Args:
+            formatter: ResponseFormatter usado na formatação
+            items: Tuplas (resultados SPARQL, tipo de consulta, pergunta, entidades)
+            
+        Yields:
+            Respostas melhoradas, na mesma ordem de `items`
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        
+        async def produce() -> None:
+            try:
+                for results, query_type, question, entities in items:
+                    formatted = await loop.run_in_executor(
+                        None, formatter.format_response, results, query_type, question, entities
+                    )
+                    await queue.put((formatted, question, query_type.value))
+                await queue.put(None)
+            except asyncio.CancelledError:
+                # Consumidor fechou o gerador antes do fim: não espera por
+                # espaço na fila (ninguém mais a esvazia)
+                with contextlib.suppress(asyncio.QueueFull):
+                    queue.put_nowait(None)
+                raise
+            except Exception:
+                # Erro na formatação: o marcador acorda o consumidor, que o
+                # propaga ao aguardar o producer
+                await queue.put(None)
+                raise
+        
+        producer = asyncio.create_task(produce())
+        try:
+            async with self._ollama.AsyncClient() as client:
+                while (item := await queue.get()) is not None:
+                    formatted, question, query_type = item
+                    yield await self._aenhance_response(client, formatted, question, query_type)
+            # Propaga erro da formatação, se houve
+            await producer
+        finally:
+            producer.cancel()
+    
+    async def _aenhance_response(self,
+                                 client,
+                                 formatted_response: FormattedResponse,
+                                 original_question: str,
+                                 query_type: str) -> EnhancedResponse:
+        """Versão assíncrona de enhance_response (mesmo fallback em caso de erro)"""
+        start_time = time.perf_counter()
+        
+        trivial_answer = self._trivial_answer(formatted_response, original_question)
+        if trivial_answer is not None:
+            return EnhancedResponse(
+                natural_answer=trivial_answer,
+                structured_data=formatted_response.answer,
+                confidence=formatted_response.confidence,
+                processing_time=time.perf_counter() - start_time
+            )
+        
+        try:
+            prompt = self._create_enhancement_prompt(
+                question=original_question,
+                structured_answer=formatted_response.answer,
+                query_type=query_type,
+                confidence=formatted_response.confidence,
+                metadata=formatted_response.metadata
+            )
+            
+            cache_key = self._cache_key(prompt)
+            natural_answer = self._cache_get(cache_key)
+            if natural_answer is None:
+                natural_answer = await self._agenerate(client, prompt)
+                self._cache_put(cache_key, natural_answer)
+            
+            return EnhancedResponse(
+                natural_answer=natural_answer,
+                structured_data=formatted_response.answer,
+                confidence=formatted_response.confidence,
+                processing_time=time.perf_counter() - start_time
+            )
+            
+        except Exception as e:
+            logger.error(f"❌ Erro no enhancement: {e}")
+            return EnhancedResponse(
+                natural_answer=formatted_response.answer,
+                structured_data=formatted_response.answer,
+                confidence=formatted_response.confidence * 0.8,  # Reduz confidence
+                processing_time=time.perf_counter() - start_time
             )
     
+    def enhance_response_stream(self,
+                                formatted_response: FormattedResponse,
+                                original_question: str,
+                                query_type: str) -> Iterator[str]:
+        """
+        Versão em streaming de enhance_response: produz a resposta natural
+        em pedaços, à medida que o LLM gera os tokens
+        
+        Se o LLM falhar antes do primeiro pedaço, produz a resposta
+        estruturada original (mesmo fallback de enhance_response).
+        
+        Args:
+            formatted_response: Resposta estruturada do ResponseFormatter
+            original_question: Pergunta original do usuário
+            query_type: Tipo de consulta executada
+            
+        Yields:
+            Pedaços da resposta em linguagem natural
+        """
+        trivial_answer = self._trivial_answer(formatted_response, original_question)
+        if trivial_answer is not None:
+            yield trivial_answer
+            return
+        
+        started = False
+        try:
+            prompt = self._create_enhancement_prompt(
+                question=original_question,
+                structured_answer=formatted_response.answer,
+                query_type=query_type,
+                confidence=formatted_response.confidence,
+                metadata=formatted_response.metadata
+            )
+            
+            cache_key = self._cache_key(prompt)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+            
+            chunks = []
+            for chunk in self._stream_natural_response(prompt):
+                started = True
+                chunks.append(chunk)
+                yield chunk
+            
+            natural_answer = ''.join(chunks).strip()
+            if len(natural_answer) >= 10:
+                self._cache_put(cache_key, natural_answer)
+                
+        except Exception as e:
+            logger.error(f"❌ Erro no enhancement: {e}")
+            if not started:
+                yield formatted_response.answer
+    
+    def _trivial_answer(self, formatted_response: FormattedResponse, original_question: str) -> Optional[str]:
+        """
+        Resposta direta, sem LLM, quando não há o que transformar em linguagem
+        natural: nenhum resultado, erro de formatação (confiança 0) ou resposta
+        estruturada muito curta
+        
+        Returns:
+            Resposta final, ou None se a resposta deve passar pelo LLM
+        """
+        if formatted_response.metadata.get('result_count', 0) == 0:
+            return f"Não encontrei informações sobre \"{original_question}\" no Knowledge Graph."
+        
+        if formatted_response.confidence == 0.0 or len(formatted_response.answer) < MIN_ENHANCE_CHARS:
+            return formatted_response.answer
+        
+        return None
+    
     def _create_enhancement_prompt(self,
                                   question: str,
                                   structured_answer: str,
@@ -124,44 +425,16 @@ class ResponseEnhancer:
                                   confidence: float,
                                   metadata: Dict[str, Any]) -> str:
         """
-        Cria prompt contextualizado para o LLM
+        Cria prompt contextualizado para o LLM (mensagem do usuário)
         
-        Adapta o prompt baseado no tipo de consulta e dados disponíveis
+        Adapta o prompt baseado no tipo de consulta e dados disponíveis.
+        As instruções fixas vão separadas, em _SYSTEM_PROMPT.
         """
         
-        # Instruções base
-        base_instructions = """Você é um assistente especializado em Machine Learning e Deep Learning. 
-Sua tarefa é converter informações estruturadas do Knowledge Graph em respostas naturais e conversacionais.
-
-REGRAS IMPORTANTES:
-1. Use linguagem clara e didática
-2. Mantenha precisão técnica
-3. Seja conciso mas informativo
-4. Use exemplos quando apropriado
-5. Responda em português brasileiro
-
-"""
-        
-        # Instruções específicas por tipo de consulta
-        query_specific_instructions = {
-            "what_is": "Explique o conceito de forma didática, incluindo definição, características principais e aplicações.",
-            "what_uses": "Liste e explique brevemente cada item que usa o conceito mencionado.",
-            "what_is_type_of": "Explique a hierarquia e classificação do conceito.",
-            "who_created": "Forneça informações sobre os criadores e contexto histórico.",
-            "how_related": "Explique as conexões e relações entre os conceitos.",
-            "list_by_type": "Apresente a lista de forma organizada com breves descrições.",
-            "find_similar": "Compare e explique as similaridades entre os conceitos."
-        }
-        
-        specific_instruction = query_specific_instructions.get(
-            query_type, 
-            "Responda de forma clara e informativa."
-        )
+        specific_instruction = self._QUERY_INSTRUCTIONS.get(query_type, self._DEFAULT_INSTRUCTION)
         
         # Monta prompt final
-        prompt = f"""{base_instructions}
-
-TIPO DE CONSULTA: {query_type}
+        prompt = f"""TIPO DE CONSULTA: {query_type}
 INSTRUÇÃO ESPECÍFICA: {specific_instruction}
 
 PERGUNTA DO USUÁRIO: "{question}"
@@ -185,33 +458,116 @@ TAREFA: Transforme as informações estruturadas acima em uma resposta natural e
         Returns:
             Resposta em linguagem natural
         """
+        cache_key = self._cache_key(prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[{
-                    "role": "user", 
-                    "content": prompt
-                }],
-                options={
-                    "num_predict": 300,  # Limite de tokens para resposta concisa
-                    "temperature": 0.7,   # Criatividade moderada
-                    "top_p": 0.9,        # Diversidade de vocabulário
-                    "stop": ["TAREFA:", "PERGUNTA:", "DADOS:"]  # Stop tokens
-                }
-            )
-            
-            natural_answer = response['message']['content'].strip()
+            natural_answer = ''.join(self._stream_natural_response(prompt)).strip()
             
             # Validação básica
             if len(natural_answer) < 10:
                 raise ValueError("Resposta muito curta")
             
+            self._cache_put(cache_key, natural_answer)
             return natural_answer
             
         except Exception as e:
             logger.error(f"❌ Erro na geração LLM: {e}")
             raise
     
+    def _generation_options(self, prompt: str) -> Dict[str, Any]:
+        """Opções de geração com num_ctx suficiente para o prompt + resposta"""
+        needed = (len(self._SYSTEM_PROMPT) + len(prompt)) // CHARS_PER_TOKEN + GENERATION_OPTIONS["num_predict"]
+        num_ctx = MIN_CONTEXT_TOKENS
+        while num_ctx < needed:
+            num_ctx *= 2
+        return {**GENERATION_OPTIONS, "num_ctx": num_ctx}
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Mensagens do chat: instruções fixas (sistema) + prompt da consulta (usuário)"""
+        return [
+            {"role": "system", "content": self._SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _cache_key(self, prompt: str) -> bytes:
+        """Chave do cache de respostas: hash do modelo + prompt"""
+        return hashlib.blake2b(
+            f"{self.model_name}\0{prompt}".encode('utf-8'), digest_size=16
+        ).digest()
+    
+    def _cache_get(self, key: bytes) -> Optional[str]:
+        """Resposta em cache para a chave (ou None), atualizando a ordem LRU"""
+        with self._cache_lock:
+            cached = self._response_cache.pop(key, None)
+            if cached is not None:
+                # Reinsere no fim para manter a ordem LRU
+                self._response_cache[key] = cached
+        return cached
+    
+    def _cache_put(self, key: bytes, natural_answer: str) -> None:
+        """Guarda a resposta no cache, descartando a menos usada se estiver cheio"""
+        with self._cache_lock:
+            if len(self._response_cache) >= LLM_CACHE_SIZE:
+                del self._response_cache[next(iter(self._response_cache))]
+            self._response_cache[key] = natural_answer
+    
+    async def _agenerate(self, client, prompt: str) -> str:
+        """
+        Gera resposta natural usando o cliente assíncrono do Ollama
+        
+        Args:
+            client: ollama.AsyncClient do event loop atual
+            prompt: Prompt contextualizado
+            
+        Returns:
+            Resposta em linguagem natural
+        """
+        response = await client.chat(
+            model=self.model_name,
+            messages=self._build_messages(prompt),
+            options=self._generation_options(prompt),
+            keep_alive=self.keep_alive
+        )
+        
+        natural_answer = response['message']['content'].strip()
+        
+        # Validação básica
+        if len(natural_answer) < 10:
+            raise ValueError("Resposta muito curta")
+        
+        return natural_answer
+    
+    def _stream_natural_response(self, prompt: str) -> Iterator[str]:
+        """
+        Gera resposta natural em streaming usando Ollama
+        
+        Args:
+            prompt: Prompt contextualizado
+            
+        Yields:
+            Pedaços de texto à medida que os tokens são gerados
+        """
+        start_time = time.perf_counter()
+        first_token = True
+        stream = self._client.chat(
+            model=self.model_name,
+            messages=self._build_messages(prompt),
+            options=self._generation_options(prompt),
+            keep_alive=self.keep_alive,
+            stream=True
+        )
+        
+        for chunk in stream:
+            content = chunk['message']['content']
+            if content:
+                if first_token:
+                    first_token = False
+                    logger.debug("⏱️ Primeiro token em %.3fs", time.perf_counter() - start_time)
+                yield content
+    
     def create_combined_response(self,
                                enhanced: EnhancedResponse,
                                show_structured: bool = True) -> str:
@@ -247,17 +603,19 @@ TAREFA: Transforme as informações estruturadas acima em uma resposta natural e
 
 
 # Factory function
-def create_response_enhancer(model_name: str = "llama3.2:3b") -> ResponseEnhancer:
+def create_response_enhancer(model_name: str = DEFAULT_MODEL,
+                             keep_alive: Union[int, str] = KEEP_ALIVE) -> ResponseEnhancer:
     """
     Factory function para criar instância do ResponseEnhancer
     
     Args:
         model_name: Modelo Ollama a usar
+        keep_alive: Tempo que o modelo fica carregado no Ollama entre chamadas
         
     Returns:
         Instância configurada do ResponseEnhancer
     """
-    return ResponseEnhancer(model_name)
+    return ResponseEnhancer(model_name, keep_alive)
 
 
 if __name__ == "__main__":
@@ -2,15 +2,29 @@
 Response Formatter: Formatador de respostas do Knowledge Graph
 """
 
+import functools
 import logging
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from collections import defaultdict
+from itertools import islice
 
 from .query_templates import QueryType
 
 logger = logging.getLogger(__name__)
 
+# Nomes locais de URI memorizados (os mesmos URIs se repetem muito nos resultados)
+URI_CACHE_SIZE = 8192
+
+
+@functools.lru_cache(maxsize=URI_CACHE_SIZE)
+def _uri_local_name(uri_str: str) -> str:
+    """Parte do URI após o último '#' (ou, sem '#', após a última '/')"""
+    head, sep, tail = uri_str.rpartition('#')
+    if sep:
+        return tail
+    return uri_str.rpartition('/')[2]
+
 
 @dataclass
 class FormattedResponse:
@@ -21,6 +35,20 @@ class FormattedResponse:
 
 
 class ResponseFormatter:
+    # Emoji por tipo de relação (construído uma vez, não a cada chamada)
+    _EMOJI_MAP = {
+        'uses': '🔧',
+        'implements': '⚙️', 
+        'is_a': '🏷️',
+        'part_of': '🧩',
+        'extends': '📈',
+        'optimizes': '⚡',
+        'measures': '📊',
+        'developed_by': '👤',
+        'proposed_by': '💡',
+        'applies_to': '🎯'
+    }
+    
     def __init__(self):
         self.formatters = {
             QueryType.WHAT_IS: self._format_what_is_response,
@@ -51,20 +79,21 @@ class ResponseFormatter:
     
     def _format_what_is_response(self, results, entities, question):
         entity_name = entities[0] if entities else "entidade"
-        entity_info = defaultdict(list)
+        # Propriedade -> valores sem repetição, na ordem em que aparecem
+        # (dict como conjunto ordenado: deduplica já na inserção)
+        entity_info = defaultdict(dict)
         entity_type = None
         entity_label = None
+        clean_uri = self._clean_uri
         
         for result in results:
             if 'type' in result:
-                entity_type = self._clean_uri(result['type'])
+                entity_type = clean_uri(result['type'])
             if 'label' in result:
                 entity_label = result['label']
             if 'property' in result and 'value' in result:
                 try:
-                    prop = self._clean_uri(result['property'])
-                    value = self._clean_uri(result['value'])
-                    entity_info[prop].append(value)
+                    entity_info[clean_uri(result['property'])][clean_uri(result['value'])] = None
                 except Exception as e:
                     # Skip problematic properties
                     continue
@@ -83,12 +112,10 @@ class ResponseFormatter:
         if entity_info:
             answer_parts.append("📊 **Propriedades**:")
             for prop, values in entity_info.items():
-                if str(prop) not in ['type', 'label']:  # Skip já mostradas (convert to str)
-                    prop_display = str(prop).replace('_', ' ').title()
-                    unique_values = list(set(str(v) for v in values))[:5]  # Max 5 valores
-                    if unique_values:  # Only show if has values
-                        values_display = ', '.join(unique_values)
-                        answer_parts.append(f"   • **{prop_display}**: {values_display}")
+                if prop not in ('type', 'label'):  # Já mostradas acima (_clean_uri devolve str)
+                    prop_display = prop.replace('_', ' ').title()
+                    values_display = ', '.join(islice(values, 5))  # Max 5 valores
+                    answer_parts.append(f"   • **{prop_display}**: {values_display}")
         
         answer = '\n'.join(answer_parts)
         
@@ -101,20 +128,19 @@ class ResponseFormatter:
     
     def _format_what_uses_response(self, results, entities, question):
         entity_name = entities[0] if entities else "entidade"
-        users_by_type = defaultdict(list)
+        # Tipo -> {label: relação}; a primeira ocorrência de cada label vale
+        # (duplicatas são descartadas já na inserção)
+        users_by_type = defaultdict(dict)
+        clean_uri = self._clean_uri
         
         for result in results:
             user_label = result.get('userLabel', 'N/A')
             user_type = result.get('userType', 'unknown')
             relation = result.get('relation', '')
             
-            user_type_clean = self._clean_uri(user_type)
-            relation_clean = self._clean_uri(relation)
-            
-            users_by_type[user_type_clean].append({
-                'label': user_label,
-                'relation': relation_clean
-            })
+            users = users_by_type[clean_uri(user_type)]
+            if user_label not in users:
+                users[user_label] = clean_uri(relation)
         
         answer_parts = []
         entity_display = entity_name.replace('_', ' ').title()
@@ -126,17 +152,12 @@ class ResponseFormatter:
             type_display = user_type.replace('_', ' ').title()
             answer_parts.append(f"📂 **{type_display}s:**")
             
-            seen = set()
-            unique_users = []
-            for user in users:
-                if user['label'] not in seen:
-                    unique_users.append(user)
-                    seen.add(user['label'])
-            
-            for user in unique_users[:10]:
-                emoji = self._get_relation_emoji(user['relation'])
-                answer_parts.append(f"   {emoji} {user['label']}")
-                total_users += 1
+            shown_users = list(islice(users.items(), 10))
+            answer_parts.extend([
+                f"   {self._get_relation_emoji(relation)} {label}"
+                for label, relation in shown_users
+            ])
+            total_users += len(shown_users)
         
         if total_users == 0:
             answer_parts = [f"🔍 Nenhuma entidade encontrada que use **{entity_display}** diretamente."]
@@ -154,21 +175,20 @@ class ResponseFormatter:
         entity_name = entities[0] if entities else "entidade"
         entity_display = entity_name.replace('_', ' ').title()
         
-        parents = []
-        for result in results:
-            parent = result.get('parent', '')
-            parent_label = result.get('parentLabel', self._clean_uri(parent))
-            if parent_label and parent_label != 'N/A':
-                parents.append(parent_label)
-        
-        unique_parents = list(set(parents))
+        clean_uri = self._clean_uri
+        parent_labels = (
+            result['parentLabel'] if 'parentLabel' in result else clean_uri(result.get('parent', ''))
+            for result in results
+        )
+        unique_parents = list(dict.fromkeys(
+            label for label in parent_labels if label and label != 'N/A'
+        ))
         answer_parts = []
         
         if unique_parents:
             answer_parts.append(f"🎯 **{entity_display}** é um tipo de:")
             answer_parts.append("")
-            for parent in unique_parents:
-                answer_parts.append(f"   🔗 {parent}")
+            answer_parts.extend([f"   🔗 {parent}" for parent in unique_parents])
         else:
             answer_parts.append(f"🎯 **{entity_display}** não possui tipos parent identificados.")
         
@@ -183,20 +203,20 @@ class ResponseFormatter:
         entity_name = entities[0] if entities else "entidade"
         entity_display = entity_name.replace('_', ' ').title()
         
-        creators = []
-        for result in results:
-            creator_label = result.get('creatorLabel', self._clean_uri(result.get('creator', '')))
-            if creator_label and creator_label != 'N/A':
-                creators.append(creator_label)
-        
-        unique_creators = list(set(creators))
+        clean_uri = self._clean_uri
+        creator_labels = (
+            result['creatorLabel'] if 'creatorLabel' in result else clean_uri(result.get('creator', ''))
+            for result in results
+        )
+        unique_creators = list(dict.fromkeys(
+            label for label in creator_labels if label and label != 'N/A'
+        ))
         answer_parts = []
         
         if unique_creators:
             answer_parts.append(f"👤 **{entity_display}** foi criado/desenvolvido por:")
             answer_parts.append("")
-            for creator in unique_creators:
-                answer_parts.append(f"   📝 {creator}")
+            answer_parts.extend([f"   📝 {creator}" for creator in unique_creators])
         else:
             answer_parts.append(f"👤 Criador de **{entity_display}** não identificado.")
         
@@ -220,15 +240,16 @@ class ResponseFormatter:
             if relation:
                 relations.append(relation)
         
-        unique_relations = list(set(relations))
+        unique_relations = list(dict.fromkeys(relations))
         answer_parts = []
         
         if unique_relations:
             answer_parts.append(f"🔗 **{entity1}** e **{entity2}** estão relacionados através de:")
             answer_parts.append("")
-            for relation in unique_relations:
-                emoji = self._get_relation_emoji(relation)
-                answer_parts.append(f"   {emoji} {relation.replace('_', ' ').title()}")
+            answer_parts.extend([
+                f"   {self._get_relation_emoji(relation)} {relation.replace('_', ' ').title()}"
+                for relation in unique_relations
+            ])
         else:
             answer_parts.append(f"🔗 Nenhuma relação direta encontrada entre **{entity1}** e **{entity2}**.")
         
@@ -243,25 +264,20 @@ class ResponseFormatter:
         entity_type = entities[0] if entities else "entidades"
         type_display = entity_type.replace('_', ' ').title()
         
-        entities_list = []
-        for result in results:
-            label = result.get('label', 'N/A')
-            entity = result.get('entity', '')
-            
-            if label and label != 'N/A':
-                entities_list.append(label)
-            elif entity:
-                entities_list.append(self._clean_uri(entity).replace('_', ' ').title())
-        
-        unique_entities = sorted(list(set(entities_list)))
+        clean_uri = self._clean_uri
+        entities_list = (
+            label if label and label != 'N/A' else clean_uri(entity).replace('_', ' ').title()
+            for label, entity in ((result.get('label', 'N/A'), result.get('entity', '')) for result in results)
+            if (label and label != 'N/A') or entity
+        )
+        unique_entities = sorted(set(entities_list))
         answer_parts = []
         
         if unique_entities:
             answer_parts.append(f"📂 **{type_display}s** no Knowledge Graph:")
             answer_parts.append("")
             
-            for i, entity in enumerate(unique_entities[:20], 1):
-                answer_parts.append(f"   {i:2d}. {entity}")
+            answer_parts.extend([f"   {i:2d}. {entity}" for i, entity in enumerate(unique_entities[:20], 1)])
             
             if len(unique_entities) > 20:
                 answer_parts.append(f"")
@@ -280,20 +296,20 @@ class ResponseFormatter:
         target_entity = entities[0] if entities else "entidade"
         target_display = target_entity.replace('_', ' ').title()
         
-        similar_entities = []
-        for result in results:
-            similar_label = result.get('similarLabel', self._clean_uri(result.get('similar', '')))
-            if similar_label and similar_label != 'N/A':
-                similar_entities.append(similar_label)
-        
-        unique_similar = list(set(similar_entities))
+        clean_uri = self._clean_uri
+        similar_labels = (
+            result['similarLabel'] if 'similarLabel' in result else clean_uri(result.get('similar', ''))
+            for result in results
+        )
+        unique_similar = list(dict.fromkeys(
+            label for label in similar_labels if label and label != 'N/A'
+        ))
         answer_parts = []
         
         if unique_similar:
             answer_parts.append(f"🔍 **Entidades similares a {target_display}**:")
             answer_parts.append("")
-            for i, entity in enumerate(unique_similar[:15], 1):
-                answer_parts.append(f"   {i:2d}. {entity}")
+            answer_parts.extend([f"   {i:2d}. {entity}" for i, entity in enumerate(unique_similar[:15], 1)])
         else:
             answer_parts.append(f"🔍 Nenhuma entidade similar a **{target_display}** encontrada.")
         
@@ -321,12 +337,11 @@ class ResponseFormatter:
         )
     
     def _format_generic_response(self, results, query_type):
-        answer_parts = [f"📊 Resultados para {query_type.value}:"]
-        answer_parts.append("")
-        
-        for i, result in enumerate(results[:10], 1):
-            result_str = ', '.join([f"{k}: {v}" for k, v in result.items()])
-            answer_parts.append(f"   {i}. {result_str}")
+        answer_parts = [f"📊 Resultados para {query_type.value}:", ""]
+        answer_parts.extend([
+            f"   {i}. " + ', '.join([f"{k}: {v}" for k, v in result.items()])
+            for i, result in enumerate(results[:10], 1)
+        ])
         
         return FormattedResponse(
             answer='\n'.join(answer_parts),
@@ -339,31 +354,12 @@ class ResponseFormatter:
         if not uri:
             return ""
         
-        # Convert to string first
-        uri_str = str(uri)
-        
-        # Remove namespace URIs
-        if '#' in uri_str:
-            return uri_str.split('#')[-1]
-        elif '/' in uri_str:
-            return uri_str.split('/')[-1]
-        else:
-            return uri_str
+        # Remove namespace URIs (convertendo para string antes do cache,
+        # para que 1, 1.0 e True não compartilhem a mesma entrada)
+        return _uri_local_name(uri if isinstance(uri, str) else str(uri))
     
     def _get_relation_emoji(self, relation: str) -> str:
-        emoji_map = {
-            'uses': '🔧',
-            'implements': '⚙️', 
-            'is_a': '🏷️',
-            'part_of': '🧩',
-            'extends': '📈',
-            'optimizes': '⚡',
-            'measures': '📊',
-            'developed_by': '👤',
-            'proposed_by': '💡',
-            'applies_to': '🎯'
-        }
-        return emoji_map.get(relation.lower(), '🔗')
+        return self._EMOJI_MAP.get(relation.lower(), '🔗')
 
 
 def create_response_formatter() -> ResponseFormatter:
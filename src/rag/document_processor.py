@@ -19,8 +19,71 @@ sys.path.append(str(project_root))
 
 from src.knowledge_graph.chunk_loader import TextChunk, ChunkLoader
 
+# Matriz de embeddings comprimida em arquivo separado (opcional)
+try:
+    import bloscpack as bp
+    BLOSCPACK_AVAILABLE = True
+except ImportError:
+    BLOSCPACK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Compressão Blosc da matriz de embeddings: zstd nível 3 com shuffle de
+# bytes (agrupa os bytes de mesma posição dos float32, que comprimem melhor)
+BLOSC_CODEC = 'zstd'
+BLOSC_LEVEL = 3
+EMBEDDINGS_SUFFIX = '.blp'
+
+# Textos por lote no encoder. O encode do sentence-transformers já ordena
+# todos os textos por tamanho antes de montar os lotes (e restaura a ordem
+# no fim), então lotes maiores desperdiçam pouco com padding.
+EMBEDDING_BATCH_SIZE = 64
+
+# Marca do formato de arquivo com buffers fora do pickle (protocolo 5)
+PICKLE_OOB_FORMAT = 'pickle5-oob'
+
+
+def _dump_out_of_band(obj: Any, f) -> None:
+    """
+    Salva `obj` com pickle protocolo 5, com os buffers dos arrays numpy fora
+    do fluxo do pickle: cabeçalho (tamanhos), fluxo do pickle e, em seguida,
+    os bytes crus de cada buffer
+    """
+    buffers = []
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    header = {
+        'format': PICKLE_OOB_FORMAT,
+        'payload_size': len(payload),
+        'buffer_sizes': [raw.nbytes for raw in raw_buffers]
+    }
+    pickle.dump(header, f, protocol=5)
+    f.write(payload)
+    for raw in raw_buffers:
+        f.write(raw)
+
+
+def _load_out_of_band(f) -> Any:
+    """
+    Lê um arquivo salvo por _dump_out_of_band; os arrays numpy usam os
+    buffers lidos do arquivo diretamente, sem cópia. Arquivos antigos (um
+    único pickle) são devolvidos como estão.
+    """
+    header = pickle.load(f)
+    if not isinstance(header, dict) or header.get('format') != PICKLE_OOB_FORMAT:
+        return header
+    
+    payload = f.read(header['payload_size'])
+    if len(payload) != header['payload_size']:
+        raise ValueError("Arquivo truncado: pickle incompleto")
+    buffers = []
+    for size in header['buffer_sizes']:
+        buffer = bytearray(size)
+        if f.readinto(buffer) != size:
+            raise ValueError("Arquivo truncado: buffer de dados incompleto")
+        buffers.append(buffer)
+    return pickle.loads(payload, buffers=buffers)
+
 @dataclass
 class ProcessedDocument:
     """Representa um documento processado com embedding."""
@@ -33,13 +96,19 @@ class ProcessedDocument:
     
     def to_dict(self) -> Dict[str, Any]:
         """Converte para dicionário serializável."""
+        return {
+            **self.metadata_dict(),
+            'embedding': self.embedding  # Array numpy (o pickle serializa o buffer direto)
+        }
+    
+    def metadata_dict(self) -> Dict[str, Any]:
+        """Campos do documento, sem o embedding."""
         return {
             'chunk_id': self.chunk_id,
             'content': self.content,
             'source_book': self.source_book,
             'chunk_number': self.chunk_number,
-            'word_count': self.word_count,
-            'embedding': self.embedding.tolist()  # Converter numpy para list
+            'word_count': self.word_count
         }
     
     @classmethod
@@ -51,23 +120,30 @@ class ProcessedDocument:
             source_book=data['source_book'],
             chunk_number=data['chunk_number'],
             word_count=data['word_count'],
-            embedding=np.array(data['embedding'])  # Converter list para numpy
+            embedding=np.asarray(data['embedding'])  # Sem cópia; aceita list de arquivos antigos
         )
 
 
 class DocumentProcessor:
     """Processador de documentos para sistema RAG."""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", batch_size: int = EMBEDDING_BATCH_SIZE):
         """
         Inicializa o processador.
         
         Args:
             model_name: Nome do modelo sentence-transformers
+            batch_size: Textos por lote ao gerar os embeddings
         """
         self.model_name = model_name
+        self.batch_size = batch_size
         self.model = None
         self.processed_docs: List[ProcessedDocument] = []
+        # Estrutura de arrays: uma matriz (N, D) float32 com todos os
+        # embeddings e os campos de cada documento em lista paralela. O
+        # embedding de cada ProcessedDocument é uma view da sua linha.
+        self.embeddings: Optional[np.ndarray] = None
+        self.metadata: List[Dict[str, Any]] = []
         
         logger.info(f"📚 DocumentProcessor inicializado com modelo: {model_name}")
     
@@ -109,52 +185,77 @@ class DocumentProcessor:
         logger.info("🤖 Gerando embeddings...")
         embeddings = self.model.encode(
             texts, 
-            batch_size=32,
+            batch_size=self.batch_size,
             show_progress_bar=True,
             convert_to_numpy=True
         )
         
         # Criar ProcessedDocuments
-        processed_docs = []
-        for chunk, embedding in zip(chunks, embeddings):
-            processed_doc = ProcessedDocument(
-                chunk_id=chunk.chunk_id,
-                content=chunk.content,
-                source_book=chunk.source_book,
-                chunk_number=chunk.chunk_number,
-                word_count=chunk.word_count,
-                embedding=embedding
-            )
-            processed_docs.append(processed_doc)
-        
-        self.processed_docs = processed_docs
+        metadata = [
+            {
+                'chunk_id': chunk.chunk_id,
+                'content': chunk.content,
+                'source_book': chunk.source_book,
+                'chunk_number': chunk.chunk_number,
+                'word_count': chunk.word_count
+            }
+            for chunk in chunks
+        ]
+        processed_docs = self._set_documents(metadata, embeddings)
         logger.info(f"✅ {len(processed_docs)} documentos processados")
         
         return processed_docs
     
+    def _set_documents(self, metadata: List[Dict[str, Any]], embeddings: np.ndarray) -> List[ProcessedDocument]:
+        """Guarda metadados + matriz de embeddings e monta os ProcessedDocuments sobre elas."""
+        self.metadata = metadata
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.processed_docs = [
+            ProcessedDocument(**doc_data, embedding=embedding)
+            for doc_data, embedding in zip(metadata, self.embeddings)
+        ]
+        return self.processed_docs
+    
     def save_processed_docs(self, filepath: str):
         """
         Salva documentos processados em arquivo.
         
+        Os embeddings são salvos como uma única matriz (N, D) float32: com
+        bloscpack instalado, comprimida em `<filepath>.blp`; sem ele, dentro
+        do próprio pickle. Os demais campos vão no pickle.
+        
         Args:
             filepath: Caminho para salvar os dados
         """
         if not self.processed_docs:
             raise ValueError("Nenhum documento processado para salvar")
         
-        # Converter para formato serializável
+        embeddings = self.embeddings
         serializable_data = {
             'model_name': self.model_name,
-            'total_docs': len(self.processed_docs),
-            'embedding_dim': self.processed_docs[0].embedding.shape[0],
-            'documents': [doc.to_dict() for doc in self.processed_docs]
+            'total_docs': len(self.metadata),
+            'embedding_dim': embeddings.shape[1],
+            'documents': self.metadata
         }
         
-        # Salvar usando pickle (mais eficiente para numpy arrays)
+        files = [Path(filepath)]
+        if BLOSCPACK_AVAILABLE:
+            embeddings_path = Path(f"{filepath}{EMBEDDINGS_SUFFIX}")
+            bp.pack_ndarray_to_file(
+                embeddings, str(embeddings_path),
+                blosc_args=bp.BloscArgs(typesize=embeddings.itemsize, clevel=BLOSC_LEVEL,
+                                        shuffle=True, cname=BLOSC_CODEC)
+            )
+            serializable_data['embeddings_file'] = embeddings_path.name
+            files.append(embeddings_path)
+        else:
+            serializable_data['embeddings'] = embeddings
+        
+        # Salvar usando pickle protocolo 5, com a matriz fora do fluxo do pickle
         with open(filepath, 'wb') as f:
-            pickle.dump(serializable_data, f)
+            _dump_out_of_band(serializable_data, f)
         
-        file_size = Path(filepath).stat().st_size / (1024 * 1024)  # MB
+        file_size = sum(path.stat().st_size for path in files) / (1024 * 1024)  # MB
         logger.info(f"💾 Documentos salvos em: {filepath}")
         logger.info(f"📊 Tamanho do arquivo: {file_size:.1f} MB")
     
@@ -172,16 +273,23 @@ class DocumentProcessor:
             raise FileNotFoundError(f"Arquivo não encontrado: {filepath}")
         
         with open(filepath, 'rb') as f:
-            data = pickle.load(f)
-        
-        # Reconstruir ProcessedDocuments
-        processed_docs = [
-            ProcessedDocument.from_dict(doc_data) 
-            for doc_data in data['documents']
-        ]
-        
+            data = _load_out_of_band(f)
+        
+        if 'embeddings_file' in data:
+            if not BLOSCPACK_AVAILABLE:
+                raise ImportError("bloscpack é necessário para ler os embeddings de " + data['embeddings_file'])
+            embeddings = bp.unpack_ndarray_from_file(str(Path(filepath).parent / data['embeddings_file']))
+        else:
+            embeddings = data.get('embeddings')
+        
+        metadata = data['documents']
+        if embeddings is None:
+            # Formato antigo: embedding dentro de cada documento
+            embeddings = np.array([doc_data.pop('embedding') for doc_data in metadata], dtype=np.float32)
+        
+        # Reconstruir ProcessedDocuments (cada embedding é uma linha da matriz)
+        processed_docs = self._set_documents(metadata, embeddings)
         self.model_name = data['model_name']
-        self.processed_docs = processed_docs
         
         logger.info(f"📂 {len(processed_docs)} documentos carregados de: {filepath}")
         logger.info(f"🤖 Modelo usado: {self.model_name}")
@@ -197,27 +305,29 @@ class DocumentProcessor:
         books = {}
         total_words = 0
         
-        for doc in self.processed_docs:
-            if doc.source_book not in books:
-                books[doc.source_book] = {'count': 0, 'words': 0}
+        for doc_data in self.metadata:
+            source_book = doc_data['source_book']
+            if source_book not in books:
+                books[source_book] = {'count': 0, 'words': 0}
             
-            books[doc.source_book]['count'] += 1
-            books[doc.source_book]['words'] += doc.word_count
-            total_words += doc.word_count
+            books[source_book]['count'] += 1
+            books[source_book]['words'] += doc_data['word_count']
+            total_words += doc_data['word_count']
         
         return {
-            'total_documents': len(self.processed_docs),
+            'total_documents': len(self.metadata),
             'total_words': total_words,
-            'avg_words_per_doc': total_words / len(self.processed_docs),
-            'embedding_dimension': self.processed_docs[0].embedding.shape[0],
+            'avg_words_per_doc': total_words / len(self.metadata),
+            'embedding_dimension': self.embeddings.shape[1],
             'model_name': self.model_name,
             'books': books
         }
 
 
-def create_document_processor(model_name: str = "all-MiniLM-L6-v2") -> DocumentProcessor:
+def create_document_processor(model_name: str = "all-MiniLM-L6-v2",
+                              batch_size: int = EMBEDDING_BATCH_SIZE) -> DocumentProcessor:
     """Factory function para criar DocumentProcessor."""
-    return DocumentProcessor(model_name)
+    return DocumentProcessor(model_name, batch_size)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+"""
+Script para testar o processamento de perguntas em lote
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao Python path
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from src.query_system.query_processor import (
+    QueryProcessor, QueryType, FALLBACK_CONFIDENCE, MAX_QUESTION_CHARS
+)
+
+
+def test_process_questions_isolates_failures():
+    """Perguntas inválidas no lote recebem intenção de busca geral sem interromper as outras."""
+    processor = QueryProcessor()
+    long_question = "o que é " + "muito " * MAX_QUESTION_CHARS + "cnn"
+    questions = [
+        "O que é CNN?",
+        "",
+        "Quem criou o ResNet?",
+        "   ",
+        long_question,
+        "Quais algoritmos usam backpropagation?",
+    ]
+
+    intents = processor.process_questions(questions)
+
+    assert len(intents) == len(questions)
+
+    # Perguntas válidas: mesma intenção que process_question daria
+    for index in (0, 2, 5):
+        expected = processor.process_question(questions[index])
+        assert intents[index] == expected
+
+    # Perguntas vazias: intenção de busca geral sem entidades
+    for index in (1, 3):
+        assert intents[index].query_type == QueryType.WHAT_IS
+        assert intents[index].entities == []
+        assert intents[index].confidence == 0.0
+
+    # Pergunta longa demais para as regex: busca geral pela última palavra
+    assert intents[4].entities == ["cnn"]
+    assert intents[4].confidence == FALLBACK_CONFIDENCE
+
+
+if __name__ == "__main__":
+    print("🧪 Testando processamento de perguntas em lote...")
+    test_process_questions_isolates_failures()
+    print("✅ Perguntas inválidas isoladas sem interromper o lote")
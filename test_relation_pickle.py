@@ -0,0 +1,66 @@
+"""
+Script para testar a compatibilidade dos pickles de relações
+"""
+
+import dataclasses
+import pickle
+import sys
+from pathlib import Path
+
+# Adicionar src ao Python path (mesmo caminho de import usado pelos scripts)
+project_root = Path(__file__).parent
+sys.path.append(str(project_root / "src"))
+
+import knowledge_graph.relation_extractor as relation_extractor
+from knowledge_graph.relation_extractor import Relation, relations_from_data
+
+FIELDS = ('machine_learning', 'uses', 'gradient_descent', 'chunk_001', 0.9,
+          'Machine learning uses gradient descent.')
+
+
+@dataclasses.dataclass
+class _OldRelation:
+    """Relation como era antes de slots=True (estado salvo como __dict__)."""
+    subject: str
+    predicate: str
+    object: str
+    chunk_id: str
+    confidence: float
+    context: str
+
+
+def _old_format_pickle() -> bytes:
+    """Gera um pickle no formato antigo: lista de objetos Relation com __dict__."""
+    _OldRelation.__module__ = Relation.__module__
+    _OldRelation.__qualname__ = Relation.__qualname__
+    current = relation_extractor.Relation
+    relation_extractor.Relation = _OldRelation
+    try:
+        return pickle.dumps({'relations': [_OldRelation(*FIELDS)]})
+    finally:
+        relation_extractor.Relation = current
+
+
+def test_load_old_relation_pickle():
+    """Pickles gravados antes de slots=True continuam carregando."""
+    data = pickle.loads(_old_format_pickle())
+    relations = relations_from_data(data)
+    
+    assert len(relations) == 1
+    assert isinstance(relations[0], Relation)
+    assert dataclasses.astuple(relations[0]) == FIELDS
+
+
+def test_roundtrip_relation_pickle():
+    """Relation com slots continua serializável no formato atual."""
+    relation = Relation(*FIELDS)
+    
+    assert pickle.loads(pickle.dumps(relation)) == relation
+    assert relations_from_data({'relations': [tuple(FIELDS)]}) == [relation]
+
+
+if __name__ == "__main__":
+    print("🧪 Testando pickles de relações...")
+    test_load_old_relation_pickle()
+    test_roundtrip_relation_pickle()
+    print("✅ Pickles antigos e atuais carregados corretamente")
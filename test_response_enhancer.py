@@ -0,0 +1,115 @@
+"""
+Script para testar o enhancement assíncrono (enhance_many e pipeline)
+com um cliente Ollama simulado, sem servidor
+"""
+
+import asyncio
+import re
+import sys
+import types
+from pathlib import Path
+
+# Adicionar o diretório raiz ao Python path
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from src.query_system.query_templates import QueryType
+from src.query_system.response_enhancer import ResponseEnhancer
+from src.query_system.response_formatter import FormattedResponse
+
+ANSWER = "Resposta estruturada longa o bastante para passar pelo LLM."
+
+
+class FakeAsyncClient:
+    """AsyncClient simulado: responde com a pergunta, na ordem inversa de chegada"""
+
+    fail_on = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def chat(self, model, messages, options=None, keep_alive=None, **kwargs):
+        question = re.search(r'PERGUNTA DO USUÁRIO: "(.*)"', messages[-1]['content']).group(1)
+        # Perguntas com número maior respondem antes (ordem de chegada != ordem dos itens)
+        await asyncio.sleep(0.01 / (1 + int(question.rsplit(" ", 1)[-1])))
+        if question in self.fail_on:
+            raise RuntimeError("Ollama indisponível")
+        return {'message': {'content': f"Resposta natural para {question}"}}
+
+
+class FakeClient:
+    def chat(self, **kwargs):
+        return {'message': {'content': "ok"}}
+
+    def show(self, model):
+        return {'details': {'quantization_level': "Q4_K_M"}}
+
+
+def _install_fake_ollama():
+    """Substitui o pacote ollama (importado em ResponseEnhancer.__init__)"""
+    fake = types.ModuleType("ollama")
+    fake.Client = FakeClient
+    fake.AsyncClient = FakeAsyncClient
+    sys.modules["ollama"] = fake
+
+
+def _formatted(question: str) -> FormattedResponse:
+    return FormattedResponse(answer=f"{ANSWER} ({question})", metadata={'result_count': 1},
+                             raw_results=[], confidence=1.0)
+
+
+class FakeFormatter:
+    def format_response(self, results, query_type, question, entities):
+        return _formatted(question)
+
+
+def test_enhance_many_keeps_order_and_falls_back():
+    """Respostas saem na ordem dos itens; erro do LLM devolve a resposta estruturada"""
+    _install_fake_ollama()
+    enhancer = ResponseEnhancer()
+    questions = [f"pergunta {i}" for i in range(5)]
+    FakeAsyncClient.fail_on = {"pergunta 2"}
+
+    items = [(_formatted(q), q, "what_is") for q in questions]
+    responses = asyncio.run(enhancer.enhance_many(items))
+
+    for i, (question, response) in enumerate(zip(questions, responses)):
+        if i == 2:
+            assert response.natural_answer == items[i][0].answer
+            assert response.confidence == 0.8
+        else:
+            assert response.natural_answer == f"Resposta natural para {question}"
+            assert response.confidence == 1.0
+
+
+def test_pipeline_early_close():
+    """Fechar o pipeline no meio não deixa a task de formatação pendente"""
+    _install_fake_ollama()
+    enhancer = ResponseEnhancer()
+    FakeAsyncClient.fail_on = set()
+    items = [([], QueryType.WHAT_IS, f"pergunta {i}", []) for i in range(10)]
+
+    async def run():
+        responses = enhancer.pipeline(FakeFormatter(), items)
+        first = await responses.__anext__()
+        # Dá tempo ao producer de encher a fila antes de fechar
+        await asyncio.sleep(0.05)
+        await responses.aclose()
+        await asyncio.sleep(0)
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        return first, pending
+
+    first, pending = asyncio.run(run())
+
+    assert first.natural_answer == "Resposta natural para pergunta 0"
+    assert pending == []
+
+
+if __name__ == "__main__":
+    print("🧪 Testando enhancement assíncrono...")
+    test_enhance_many_keeps_order_and_falls_back()
+    test_pipeline_early_close()
+    print("✅ Ordem, fallback e fechamento antecipado corretos")